@@ -1,7 +1,17 @@
+from collections import namedtuple
 from enum import Enum
 import copy
+import heapq
+from itertools import count
 import Cell
 import KnowledgeBase
+import MapValidator
+import Planner
+import Probability
+import SolverBackends
+import TraceSink
+import VariableTable
+import Zobrist
 
 
 class Action(Enum):
@@ -32,18 +42,55 @@ class Action(Enum):
     INFER_SAFE = 25
 
 
+# An action with the agent's cell after it and the change of the score it caused.
+ActionEvent = namedtuple('ActionEvent', ['action', 'map_pos', 'score_delta'])
+
+HEADING_ACTION_DICT = {Planner.UP: Action.TURN_UP,
+                       Planner.DOWN: Action.TURN_DOWN,
+                       Planner.LEFT: Action.TURN_LEFT,
+                       Planner.RIGHT: Action.TURN_RIGHT}
+
+
 class AgentBrain:
-    def __init__(self, map_filename, output_filename):
+    DFS = 'dfs'                 # Depth first over the child lists, as the original agent explores.
+    FRONTIER = 'frontier'       # Always the proven safe cell that is cheapest to reach next.
+    STRATEGY_LIST = [DFS, FRONTIER]
+    VERSION = 3                 # Bump whenever a change alters the actions taken, it keys ResultCache entries.
+
+    def __init__(self, map_filename, output_filename, kb_mode=KnowledgeBase.KnowledgeBase.INCREMENTAL,
+                 solver_name=SolverBackends.DEFAULT_BACKEND, gc_threshold=KnowledgeBase.KnowledgeBase.GC_THRESHOLD,
+                 max_risk=None, strategy=DFS, trace=None):
+        if strategy not in AgentBrain.STRATEGY_LIST:
+            raise TypeError('Error: Unknown exploration strategy ' + str(strategy) + '.')
         self.output_filename = output_filename
+        # Where the run is logged, by default the text result file at the KB level, see TraceSink.
+        self.trace = trace if trace is not None else TraceSink.TraceSink(output_filename)
 
         self.map_size = None
+        self.var_table = None
         self.cell_matrix = None
         self.init_cell_matrix = None
 
         self.cave_cell = Cell.Cell((-1, -1), 10, Cell.Object.EMPTY.value)
         self.agent_cell = None
         self.init_agent_cell = None
-        self.KB = KnowledgeBase.KnowledgeBase()
+        self.KB = None
+        self.kb_mode = kb_mode
+        self.solver_name = solver_name      # A SolverBackends name, or 'auto' to use the autotuned choice.
+        self.gc_threshold = gc_threshold    # KB size that triggers KnowledgeBase.simplify().
+        # Once logic runs out of safe moves, step into the least risky frontier cell while its hazard probability
+        # is at most max_risk. None keeps the agent to proven safe cells.
+        self.max_risk = max_risk
+        self.strategy = strategy
+        self.pit_density = Probability.PIT_DENSITY
+        self.wumpus_density = Probability.WUMPUS_DENSITY
+        self.frontier_dict = {}     # Unexplored cells adjacent to explored ones, insertion ordered.
+        self.planner = None
+        self.heading = Planner.RIGHT    # The agent starts facing right, as drawn by Graphic.
+        self.travel_cost = 0            # Planner cost of every move and turn so far.
+        self.arrow_spent = False
+        self.state = None               # Zobrist hash of the agent's state, see Zobrist.ZobristState.
+        self.visited_state_table = Zobrist.VisitedStateTable()
         self.path = []
         self.action_list = []
         self.score = 0
@@ -55,19 +102,34 @@ class AgentBrain:
         file = open(map_filename, 'r')
 
         self.map_size = int(file.readline())
+        self.var_table = VariableTable.VariableTable(self.map_size)
         raw_map = [line.split('.') for line in file.read().splitlines()]
 
         self.cell_matrix = [[None for _ in range(self.map_size)] for _ in range(self.map_size)]
         for ir in range(self.map_size):
             for ic in range(self.map_size):
-                self.cell_matrix[ir][ic] = Cell.Cell((ir, ic), self.map_size, raw_map[ir][ic])
+                self.cell_matrix[ir][ic] = Cell.Cell((ir, ic), self.map_size, raw_map[ir][ic], self.var_table)
                 if Cell.Object.AGENT.value in raw_map[ir][ic]:
                     self.agent_cell = self.cell_matrix[ir][ic]
                     self.agent_cell.update_parent(self.cave_cell)
                     self.init_agent_cell = copy.deepcopy(self.agent_cell)
 
         file.close()
+        self.KB = KnowledgeBase.KnowledgeBase(self.kb_mode, self.var_table.get_first_free_var(),
+                                              SolverBackends.resolve_backend(self.solver_name, self.map_size),
+                                              self.gc_threshold)
         self.init_cell_matrix = copy.deepcopy(self.cell_matrix)
+        self.planner = Planner.PathPlanner(self.cell_matrix)
+
+        self.state = Zobrist.ZobristState(self.map_size * self.map_size, Planner.HEADING_LIST)
+        self.state.set_position(self.agent_cell.index_pos)
+        self.state.set_heading(self.heading)
+        for cell_row in self.cell_matrix:
+            for cell in cell_row:
+                if cell.exist_gold():
+                    self.state.toggle_gold(cell.index_pos)
+                if cell.exist_wumpus():
+                    self.state.toggle_wumpus(cell.index_pos)
 
 
         result, pos = self.is_valid_map()
@@ -78,32 +140,13 @@ class AgentBrain:
 
 
     def is_valid_map(self):
-        for cell_row in self.cell_matrix:
-            for cell in cell_row:
-                adj_cell_list = cell.get_adj_cell_list(self.cell_matrix)
-                if cell.exist_pit():
-                    for adj_cell in adj_cell_list:
-                        if not adj_cell.exist_breeze():
-                            return False, cell.matrix_pos
-                if cell.exist_wumpus():
-                    for adj_cell in adj_cell_list:
-                        if not adj_cell.exist_stench():
-                            return False, cell.matrix_pos
-        if self.agent_cell is None:
-            return False, None
-        return True, None
-
-
-    def append_event_to_output_file(self, text: str):
-        out_file = open(self.output_filename, 'a')
-        out_file.write(text + '\n')
-        out_file.close()
+        # (False, matrix_pos of a Pit or Wumpus missing a neighbour percept) or (False, None) without an agent.
+        return MapValidator.is_valid(MapValidator.get_cell_layers(self.cell_matrix, self.agent_cell))
 
 
     def add_action(self, action):
-        self.action_list.append(action)
-        print(action)
-        self.append_event_to_output_file(action.name)
+        # Books the action and returns its ActionEvent, the search generators yield it right away.
+        score = self.score
 
         if action == Action.TURN_LEFT:
             pass
@@ -115,38 +158,29 @@ class AgentBrain:
             pass
         elif action == Action.MOVE_FORWARD:
             self.score -= 10
-            print('Score: ' + str(self.score))
-            self.append_event_to_output_file('Score: ' + str(self.score))
         elif action == Action.GRAB_GOLD:
             self.score += 100
-            print('Score: ' + str(self.score))
-            self.append_event_to_output_file('Score: ' + str(self.score))
         elif action == Action.PERCEIVE_BREEZE:
             pass
         elif action == Action.PERCEIVE_STENCH:
             pass
         elif action == Action.SHOOT:
+            if not self.arrow_spent:
+                self.arrow_spent = True
+                self.state.toggle_arrow()
             self.score -= 100
-            print('Score: ' + str(self.score))
-            self.append_event_to_output_file('Score: ' + str(self.score))
         elif action == Action.KILL_WUMPUS:
             pass
         elif action == Action.KILL_NO_WUMPUS:
             pass
         elif action == Action.BE_EATEN_BY_WUMPUS:
             self.score -= 10000
-            print('Score: ' + str(self.score))
-            self.append_event_to_output_file('Score: ' + str(self.score))
         elif action == Action.FALL_INTO_PIT:
             self.score -= 10000
-            print('Score: ' + str(self.score))
-            self.append_event_to_output_file('Score: ' + str(self.score))
         elif action == Action.KILL_ALL_WUMPUS_AND_GRAB_ALL_FOOD:
             pass
         elif action == Action.CLIMB_OUT_OF_THE_CAVE:
             self.score += 10
-            print('Score: ' + str(self.score))
-            self.append_event_to_output_file('Score: ' + str(self.score))
         elif action == Action.DECTECT_PIT:
             pass
         elif action == Action.DETECT_WUMPUS:
@@ -169,6 +203,8 @@ class AgentBrain:
             pass
         else:
             raise TypeError("Error: " + self.add_action.__name__)
+        self.trace.emit(TraceSink.ACTION, self.agent_cell.map_pos, (action, self.score - score))
+        return ActionEvent(action, self.agent_cell.map_pos, self.score - score)
 
 
     def add_new_percepts_to_KB(self, cell):
@@ -196,25 +232,29 @@ class AgentBrain:
         sign = '-'
         if cell.exist_breeze():
             sign = '+'
-        self.KB.add_clause([cell.get_literal(Cell.Object.BREEZE, sign)])
+        breeze_group = cell.get_percept_group(Cell.Object.BREEZE) if cell.exist_breeze() else None
+        self.KB.add_clause([cell.get_literal(Cell.Object.BREEZE, sign)], breeze_group)
 
         sign = '-'
         if cell.exist_stench():
             sign = '+'
-        self.KB.add_clause([cell.get_literal(Cell.Object.STENCH, sign)])
+        stench_group = cell.get_percept_group(Cell.Object.STENCH) if cell.exist_stench() else None
+        self.KB.add_clause([cell.get_literal(Cell.Object.STENCH, sign)], stench_group)
 
+        # PL: This cell has Breeze iff At least one of all of adjacent cells has a Pit.
+        # The biconditional shares the clause group of the Breeze percept so it can be retracted as a whole.
         if cell.exist_breeze():
             # B => Pa v Pb v Pc v Pd
             clause = [cell.get_literal(Cell.Object.BREEZE, '-')]
             for adj_cell in adj_cell_list:
                 clause.append(adj_cell.get_literal(Cell.Object.PIT, '+'))
-            self.KB.add_clause(clause)
+            self.KB.add_clause(clause, breeze_group)
 
             # Pa v Pb v Pc v Pd => B
             for adj_cell in adj_cell_list:
                 clause = [cell.get_literal(Cell.Object.BREEZE, '+'),
                           adj_cell.get_literal(Cell.Object.PIT, '-')]
-                self.KB.add_clause(clause)
+                self.KB.add_clause(clause, breeze_group)
 
         # PL: This cell has no Breeze then all of adjacent cells has no Pit.
         # -Pa ^ -Pb ^ -Pc ^ -Pd
@@ -224,18 +264,19 @@ class AgentBrain:
                 self.KB.add_clause(clause)
 
         # PL: This cell has Stench iff At least one of all of adjacent cells has a Wumpus.
+        # Killing a Wumpus retracts this clause group (see Cell.kill_wumpus).
         if cell.exist_stench():
             # S => Wa v Wb v Wc v Wd
             clause = [cell.get_literal(Cell.Object.STENCH, '-')]
             for adj_cell in adj_cell_list:
                 clause.append(adj_cell.get_literal(Cell.Object.WUMPUS, '+'))
-            self.KB.add_clause(clause)
+            self.KB.add_clause(clause, stench_group)
 
             # Wa v Wb v Wc v Wd => S
             for adj_cell in adj_cell_list:
                 clause = [cell.get_literal(Cell.Object.STENCH, '+'),
                           adj_cell.get_literal(Cell.Object.WUMPUS, '-')]
-                self.KB.add_clause(clause)
+                self.KB.add_clause(clause, stench_group)
 
         # PL: This cell has no Stench then all of adjacent cells has no Wumpus.
         # -Wa ^ -Wb ^ -Wc ^ -Wd
@@ -244,58 +285,336 @@ class AgentBrain:
                 clause = [adj_cell.get_literal(Cell.Object.WUMPUS, '-')]
                 self.KB.add_clause(clause)
 
-        print(self.KB.KB)
-        self.append_event_to_output_file(str(self.KB.KB))
+        self.trace.emit_kb(TraceSink.KB_DUMP, cell.map_pos, self.KB.KB)
+
+
+    def explore_cell(self, cell):
+        cell.explore()
+        self.state.toggle_explored(cell.index_pos)
+        if not cell.exist_pit():
+            self.planner.add_safe_cell(cell)
+        self.frontier_dict.pop(cell, None)
+        for adj_cell in cell.get_adj_cell_list(self.cell_matrix):
+            if not adj_cell.is_explored():
+                self.frontier_dict[adj_cell] = None
+        self.retire_cells([cell] + cell.get_adj_cell_list(self.cell_matrix))
+
+
+    def retire_cells(self, cell_list):
+        # A cell surrounded by explored cells is never asked about again, its variables can be collected.
+        for cell in cell_list:
+            adj_cell_list = cell.get_adj_cell_list(self.cell_matrix)
+            if cell.is_explored() and all(adj_cell.is_explored() for adj_cell in adj_cell_list):
+                self.KB.retire_vars([cell.get_literal(obj) for obj in VariableTable.VariableTable.PREDICATE_LIST])
+
+
+    def classify_cells(self, cell_list):
+        # One backbone pass over the cells the agent is about to infer about. Only the unexplored neighbours of
+        # the agent are passed: a pass over the whole frontier grows with the map and runs on every cell.
+        if self.KB.mode != KnowledgeBase.KnowledgeBase.INCREMENTAL:
+            return
+        var_list = []
+        for cell in cell_list:
+            if not cell.is_explored():
+                var_list.append(cell.get_literal(Cell.Object.PIT, '+'))
+                var_list.append(cell.get_literal(Cell.Object.WUMPUS, '+'))
+        self.KB.compute_backbone(var_list)
+
+
+    def is_safe(self, cell):
+        goal_list = [cell.get_literal(Cell.Object.PIT, '-'), cell.get_literal(Cell.Object.WUMPUS, '-')]
+        result = self.KB.prove(goal_list)
+        if self.trace.is_enabled(TraceSink.QUERIES):
+            self.trace.emit(TraceSink.QUERY, cell.map_pos, (goal_list, result))
+        return result
+
+
+    def infer(self, cell, not_alpha):
+        # KB |= alpha for the unit clauses of not_alpha, the negated query.
+        result = self.KB.infer(not_alpha)
+        if self.trace.is_enabled(TraceSink.QUERIES):
+            self.trace.emit(TraceSink.QUERY, cell.map_pos, ([-clause[0] for clause in not_alpha], result))
+        return result
+
+
+    def get_hazard_probabilities(self):
+        # Probability that each frontier cell holds a Pit or a Wumpus, given the percepts of the explored cells.
+        pit_constraint_list = []
+        wumpus_constraint_list = []
+        for cell_row in self.cell_matrix:
+            for cell in cell_row:
+                if not cell.is_explored():
+                    continue
+                adj_cell_list = cell.get_adj_cell_list(self.cell_matrix)
+                unknown_cell_list = [adj_cell for adj_cell in adj_cell_list if not adj_cell.is_explored()]
+                if not unknown_cell_list:
+                    continue
+                # A detected Pit next to a Breeze already explains it.
+                if not any(adj_cell.is_explored() and adj_cell.exist_pit() for adj_cell in adj_cell_list):
+                    pit_constraint_list.append((unknown_cell_list, cell.exist_breeze()))
+                wumpus_constraint_list.append((unknown_cell_list, cell.exist_stench()))
+
+        pit_dict = Probability.get_hazard_probabilities(pit_constraint_list, self.pit_density)
+        wumpus_dict = Probability.get_hazard_probabilities(wumpus_constraint_list, self.wumpus_density)
+        hazard_dict = {}
+        for cell in self.frontier_dict:
+            if self.is_safe(cell):
+                hazard_dict[cell] = 0.0
+                continue
+            hazard_dict[cell] = Probability.combine_hazards(pit_dict.get(cell, self.pit_density),
+                                                            wumpus_dict.get(cell, self.wumpus_density))
+        return hazard_dict
+
+
+    def kill_wumpus(self, wumpus_cell):
+        stench_cell_list = [cell for cell in wumpus_cell.get_adj_cell_list(self.cell_matrix)
+                            if cell.is_explored() and cell.exist_stench()]
+        wumpus_cell.kill_wumpus(self.cell_matrix, self.KB)
+        self.state.toggle_wumpus(wumpus_cell.index_pos)
+        # The scream tells the Wumpus cell held no Pit and is empty now, and an explored cell that lost its Stench
+        # perceives no Wumpus around it any more. The frontier strategy needs these facts to prove the cells its
+        # visits left out safe, every strategy saves the solver the queries they settle.
+        self.KB.add_clause([wumpus_cell.get_literal(Cell.Object.PIT, '-')])
+        self.KB.add_clause([wumpus_cell.get_literal(Cell.Object.WUMPUS, '-')])
+        for stench_cell in stench_cell_list:
+            if not stench_cell.exist_stench():
+                for adj_cell in stench_cell.get_adj_cell_list(self.cell_matrix):
+                    self.KB.add_clause([adj_cell.get_literal(Cell.Object.WUMPUS, '-')])
+        self.trace.emit_kb(TraceSink.KB_UPDATE, self.agent_cell.map_pos, self.KB.KB)
+
+
+    def follow_path(self, path):
+        for next_cell in path:
+            yield from self.move_to(next_cell)
+            self.trace.emit(TraceSink.MOVE, self.agent_cell.map_pos)
+
+
+    def risk_search(self):
+        # Logic has nothing left to prove safe: repeatedly walk to the least risky frontier cell and explore
+        # from there, until every remaining cell is riskier than max_risk. Then return to the start cell.
+        while self.frontier_dict:
+            hazard_dict = self.get_hazard_probabilities()
+            distance_map = self.planner.get_distance_map(self.agent_cell, self.heading)
+            path = None
+            for target_cell in sorted(hazard_dict, key=hazard_dict.get):
+                if hazard_dict[target_cell] > self.max_risk:
+                    break
+                if self.is_repeated_visit(target_cell):
+                    continue
+                path = distance_map.get_path(target_cell)
+                if path is not None:
+                    break
+            if path is None:
+                break
+            self.trace.emit(TraceSink.RISK, target_cell.map_pos, hazard_dict[target_cell])
+            yield from self.follow_path(path[:-1])
+            target_cell.update_parent(self.agent_cell)
+            self.agent_cell.child_list.append(target_cell)
+            yield from self.follow_path([target_cell])
+            if not (yield from self.search()):
+                return False
+
+        yield from self.travel_to(self.cell_matrix[self.init_agent_cell.matrix_pos[0]][self.init_agent_cell.matrix_pos[1]])
+        return True
+
+
+    def travel_to(self, goal_cell):
+        # Cheapest route through the known safe cells, goal_cell may be the frontier cell to step into.
+        path = self.planner.find_path(self.agent_cell, self.heading, goal_cell)
+        if path is None:
+            raise TypeError('Error: No safe path from ' + str(self.agent_cell.map_pos) + ' to ' +
+                            str(goal_cell.map_pos) + '.')
+        yield from self.follow_path(path)
 
 
     def turn_to(self, next_cell):
-        if next_cell.map_pos[0] == self.agent_cell.map_pos[0]:
-            if next_cell.map_pos[1] - self.agent_cell.map_pos[1] == 1:
-                self.add_action(Action.TURN_UP)
-            else:
-                self.add_action(Action.TURN_DOWN)
-        elif next_cell.map_pos[1] == self.agent_cell.map_pos[1]:
-            if next_cell.map_pos[0] - self.agent_cell.map_pos[0] == 1:
-                self.add_action(Action.TURN_RIGHT)
-            else:
-                self.add_action(Action.TURN_LEFT)
-        else:
+        # Only turns when the agent does not face next_cell already.
+        heading = Planner.get_heading(self.agent_cell, next_cell)
+        if heading not in HEADING_ACTION_DICT:
             raise TypeError('Error: ' + self.turn_to.__name__)
+        if heading != self.heading:
+            self.state.turn(self.heading, heading)
+            self.heading = heading
+            self.travel_cost += Planner.TURN_COST
+            yield self.add_action(HEADING_ACTION_DICT[heading])
 
 
     def move_to(self, next_cell):
-        self.turn_to(next_cell)
-        self.add_action(Action.MOVE_FORWARD)
+        yield from self.turn_to(next_cell)
+        self.travel_cost += Planner.MOVE_COST
+        self.state.move(self.agent_cell.index_pos, next_cell.index_pos)
         self.agent_cell = next_cell
+        yield self.add_action(Action.MOVE_FORWARD)
+
+
+    def record_visit(self):
+        index_pos = self.agent_cell.index_pos
+        self.visited_state_table.visit(self.state.get_visit_key(index_pos, self.heading, index_pos))
+
+
+    def is_repeated_visit(self, next_cell):
+        # Safety net for the unattended strategies: visiting next_cell would reach a state seen before, nothing
+        # changed since and the visit would repeat the same decisions.
+        key = self.state.get_visit_key(self.agent_cell.index_pos, self.heading, next_cell.index_pos)
+        step = self.visited_state_table.get_repeated_step(key)
+        if step is None:
+            return False
+        self.trace.emit(TraceSink.LOOP, next_cell.map_pos, step)
+        return True
+
+
+    def search(self):
+        if self.strategy == AgentBrain.FRONTIER:
+            return (yield from self.frontier_search())
+        return (yield from self.backtracking_search())
+
+
+    def frontier_search(self):
+        # Best first exploration: a heap of the proven safe unexplored cells keyed by travel cost from the agent.
+        # A key is the cost of the route when it was planned plus travel_cost at that time. The agent's travel
+        # since then can shorten the route by at most what it cost, so key - travel_cost bounds the current cost
+        # from below. A popped entry is re-keyed from the current position, first with the cheap lower bound of the
+        # planner then with A*, and only taken if it still beats every bound, otherwise it goes back with its new
+        # key. Returns with the agent on its start cell.
+        start_cell = self.agent_cell
+        if not (yield from self.visit_cell()):
+            return False
+        heap = []
+        tie_breaker = count()
+        self.push_children(heap, tie_breaker)
+        while True:
+            if not heap:
+                # Later percepts may prove Pits and safe cells the local inference left behind.
+                while (yield from self.detect_frontier_pits()):
+                    pass
+                self.push_proven_frontier(heap, tie_breaker)
+                if not heap:
+                    break
+            _, _, next_cell = heapq.heappop(heap)
+            if next_cell.is_explored() or self.is_repeated_visit(next_cell):
+                continue
+            bound = self.planner.get_lower_bound(self.agent_cell, self.heading, next_cell)
+            if heap and bound > heap[0][0] - self.travel_cost:
+                heapq.heappush(heap, (bound + self.travel_cost, next(tie_breaker), next_cell))
+                continue
+            path = self.planner.find_path(self.agent_cell, self.heading, next_cell)
+            cost = self.planner.get_path_cost(self.agent_cell, self.heading, path)
+            if heap and cost > heap[0][0] - self.travel_cost:
+                heapq.heappush(heap, (cost + self.travel_cost, next(tie_breaker), next_cell))
+                continue
+
+            yield from self.follow_path(path)
+            if not (yield from self.visit_cell()):
+                return False
+            self.push_children(heap, tie_breaker)
+
+        yield from self.travel_to(start_cell)
+        return True
+
+
+    def push_children(self, heap, tie_breaker):
+        for child_cell in self.agent_cell.child_list:
+            if not child_cell.is_explored():
+                cost, _ = self.planner.get_step_cost(self.heading, self.agent_cell, child_cell)
+                heapq.heappush(heap, (cost + self.travel_cost, next(tie_breaker), child_cell))
+
+
+    def detect_frontier_pits(self):
+        # A frontier cell proven to hold a Pit is detected from a neighbour as in visit_cell(), its percepts may
+        # prove other cells safe. Returns True when a Pit was detected.
+        detected = False
+        for cell in list(self.frontier_dict):
+            if cell.parent is not None or not any(adj_cell in self.planner
+                                                 for adj_cell in cell.get_adj_cell_list(self.cell_matrix)):
+                continue
+            if not self.infer(cell, [[cell.get_literal(Cell.Object.PIT, '-')]]):
+                continue
+            path = self.planner.find_path(self.agent_cell, self.heading, cell)
+            if path is None:
+                continue
+            yield from self.follow_path(path[:-1])
+            self.trace.emit(TraceSink.INFER, cell.map_pos)
+            yield from self.turn_to(cell)
+            yield self.add_action(Action.INFER_PIT)
+            yield self.add_action(Action.DECTECT_PIT)
+            self.explore_cell(cell)
+            self.add_new_percepts_to_KB(cell)
+            cell.update_parent(cell)
+            detected = True
+        return detected
+
+
+    def push_proven_frontier(self, heap, tie_breaker):
+        # Every route starts from the agent, one distance map answers them all once a cell is proven safe.
+        distance_map = None
+        for cell in list(self.frontier_dict):
+            if cell.parent is not None or not self.is_safe(cell):
+                continue
+            if distance_map is None:
+                distance_map = self.planner.get_distance_map(self.agent_cell, self.heading)
+            path = distance_map.get_path(cell)
+            if path is None:
+                continue
+            cell.update_parent(path[-2] if len(path) > 1 else self.agent_cell)
+            self.trace.emit(TraceSink.SAFE, cell.map_pos)
+            heapq.heappush(heap, (distance_map.cost_dict[cell] + self.travel_cost, next(tie_breaker), cell))
 
 
     def backtracking_search(self):
+        # Depth first exploration from the agent's cell with an explicit stack of iterators over child lists, so
+        # the depth is bounded by memory instead of the recursion limit. The cells are visited in the order of the
+        # former recursive search, the planner routes between them. Returns with the agent on its start cell.
+        start_cell = self.agent_cell
+        if not (yield from self.visit_cell()):
+            return False
+        stack = [iter(self.agent_cell.child_list)]
+        while stack:
+            next_cell = next(stack[-1], None)
+            if next_cell is None:
+                stack.pop()
+                continue
+            if self.is_repeated_visit(next_cell):
+                continue
+
+            # Go straight to the next child instead of walking back up the tree first.
+            yield from self.travel_to(next_cell)
+            if not (yield from self.visit_cell()):
+                return False
+            stack.append(iter(self.agent_cell.child_list))
+
+        yield from self.travel_to(start_cell)
+        return True
+
+
+    def visit_cell(self):
+        # Perceive the agent's cell, update the KB and decide its child_list. Returns False if the agent dies.
         # If there is a Pit, Agent dies.
         if self.agent_cell.exist_pit():
-            self.add_action(Action.FALL_INTO_PIT)
+            yield self.add_action(Action.FALL_INTO_PIT)
             return False
 
         # If there is a Wumpus, Agent dies.
         if self.agent_cell.exist_wumpus():
-            self.add_action(Action.BE_EATEN_BY_WUMPUS)
+            yield self.add_action(Action.BE_EATEN_BY_WUMPUS)
             return False
 
         # If there is Gold, Agent grabs Gold.
         if self.agent_cell.exist_gold():
-            self.add_action(Action.GRAB_GOLD)
+            yield self.add_action(Action.GRAB_GOLD)
             self.agent_cell.grab_gold()
+            self.state.toggle_gold(self.agent_cell.index_pos)
 
         # If there is Breeze, Agent perceives Breeze.
         if self.agent_cell.exist_breeze():
-            self.add_action(Action.PERCEIVE_BREEZE)
+            yield self.add_action(Action.PERCEIVE_BREEZE)
 
         # If there is Stench, Agent perceives Stench.
         if self.agent_cell.exist_stench():
-            self.add_action(Action.PERCEIVE_STENCH)
+            yield self.add_action(Action.PERCEIVE_STENCH)
 
         # If this cell is not explored, mark this cell as explored then add new percepts to the KB.
         if not self.agent_cell.is_explored():
-            self.agent_cell.explore()
+            self.explore_cell(self.agent_cell)
             self.add_new_percepts_to_KB(self.agent_cell)
 
         # Initialize valid_adj_cell_list.
@@ -306,12 +625,12 @@ class AgentBrain:
         if self.agent_cell.parent in valid_adj_cell_list:
             valid_adj_cell_list.remove(self.agent_cell.parent)
 
-        # Store previos agent's cell.
-        pre_agent_cell = self.agent_cell
-
         # If the current cell is OK (there is no Breeze or Stench), Agent move to all of valid adjacent cells.
         # If the current cell has Breeze or/and Stench, Agent infers base on the KB to make a decision.
         if not self.agent_cell.is_OK():
+            # Decide the Pit and Wumpus status of the neighbours at once, the inferences below hit the cache.
+            self.classify_cells(valid_adj_cell_list)
+
             # Discard all of explored cells having Pit from the valid_adj_cell_list.
             temp_adj_cell_list = []
             for valid_adj_cell in valid_adj_cell_list:
@@ -326,38 +645,35 @@ class AgentBrain:
             if self.agent_cell.exist_stench():
                 valid_adj_cell: Cell.Cell
                 for valid_adj_cell in valid_adj_cell_list:
-                    print("Infer: ", end='')
-                    print(valid_adj_cell.map_pos)
-                    self.append_event_to_output_file('Infer: ' + str(valid_adj_cell.map_pos))
-                    self.turn_to(valid_adj_cell)
+                    self.trace.emit(TraceSink.INFER, valid_adj_cell.map_pos)
+                    yield from self.turn_to(valid_adj_cell)
 
                     # Infer Wumpus.
-                    self.add_action(Action.INFER_WUMPUS)
+                    yield self.add_action(Action.INFER_WUMPUS)
                     not_alpha = [[valid_adj_cell.get_literal(Cell.Object.WUMPUS, '-')]]
-                    have_wumpus = self.KB.infer(not_alpha)
+                    have_wumpus = self.infer(valid_adj_cell, not_alpha)
 
                     # If we can infer Wumpus.
                     if have_wumpus:
                         # Dectect Wumpus.
-                        self.add_action(Action.DETECT_WUMPUS)
+                        yield self.add_action(Action.DETECT_WUMPUS)
 
                         # Shoot this Wumpus.
-                        self.add_action(Action.SHOOT)
-                        self.add_action(Action.KILL_WUMPUS)
-                        valid_adj_cell.kill_wumpus(self.cell_matrix, self.KB)
-                        self.append_event_to_output_file('KB: ' + str(self.KB.KB))
+                        yield self.add_action(Action.SHOOT)
+                        yield self.add_action(Action.KILL_WUMPUS)
+                        self.kill_wumpus(valid_adj_cell)
 
                     # If we can not infer Wumpus.
                     else:
                         # Infer not Wumpus.
-                        self.add_action(Action.INFER_NOT_WUMPUS)
+                        yield self.add_action(Action.INFER_NOT_WUMPUS)
                         not_alpha = [[valid_adj_cell.get_literal(Cell.Object.WUMPUS, '+')]]
-                        have_no_wumpus = self.KB.infer(not_alpha)
+                        have_no_wumpus = self.infer(valid_adj_cell, not_alpha)
 
                         # If we can infer not Wumpus.
                         if have_no_wumpus:
                             # Detect no Wumpus.
-                            self.add_action(Action.DETECT_NO_WUMPUS)
+                            yield self.add_action(Action.DETECT_NO_WUMPUS)
 
                         # If we can not infer not Wumpus.
                         else:
@@ -381,16 +697,13 @@ class AgentBrain:
                     adj_cell_list.remove(explored_cell)
 
                 for adj_cell in adj_cell_list:
-                    print("Try: ", end='')
-                    print(adj_cell.map_pos)
-                    self.append_event_to_output_file('Try: ' + str(adj_cell.map_pos))
-                    self.turn_to(adj_cell)
+                    self.trace.emit(TraceSink.TRY, adj_cell.map_pos)
+                    yield from self.turn_to(adj_cell)
 
-                    self.add_action(Action.SHOOT)
+                    yield self.add_action(Action.SHOOT)
                     if adj_cell.exist_wumpus():
-                        self.add_action(Action.KILL_WUMPUS)
-                        adj_cell.kill_wumpus(self.cell_matrix, self.KB)
-                        self.append_event_to_output_file('KB: ' + str(self.KB.KB))
+                        yield self.add_action(Action.KILL_WUMPUS)
+                        self.kill_wumpus(adj_cell)
 
                     if not self.agent_cell.exist_stench():
                         self.agent_cell.update_child_list([adj_cell])
@@ -401,23 +714,21 @@ class AgentBrain:
             if self.agent_cell.exist_breeze():
                 valid_adj_cell: Cell.Cell
                 for valid_adj_cell in valid_adj_cell_list:
-                    print("Infer: ", end='')
-                    print(valid_adj_cell.map_pos)
-                    self.append_event_to_output_file('Infer: ' + str(valid_adj_cell.map_pos))
-                    self.turn_to(valid_adj_cell)
+                    self.trace.emit(TraceSink.INFER, valid_adj_cell.map_pos)
+                    yield from self.turn_to(valid_adj_cell)
 
                     # Infer Pit.
-                    self.add_action(Action.INFER_PIT)
+                    yield self.add_action(Action.INFER_PIT)
                     not_alpha = [[valid_adj_cell.get_literal(Cell.Object.PIT, '-')]]
-                    have_pit = self.KB.infer(not_alpha)
+                    have_pit = self.infer(valid_adj_cell, not_alpha)
 
                     # If we can infer Pit.
                     if have_pit:
                         # Detect Pit.
-                        self.add_action(Action.DECTECT_PIT)
+                        yield self.add_action(Action.DECTECT_PIT)
 
                         # Mark these cells as explored.
-                        valid_adj_cell.explore()
+                        self.explore_cell(valid_adj_cell)
 
                         # Add new percepts of these cells to the KB.
                         self.add_new_percepts_to_KB(valid_adj_cell)
@@ -431,14 +742,14 @@ class AgentBrain:
                     # If we can not infer Pit.
                     else:
                         # Infer not Pit.
-                        self.add_action(Action.INFER_NOT_PIT)
+                        yield self.add_action(Action.INFER_NOT_PIT)
                         not_alpha = [[valid_adj_cell.get_literal(Cell.Object.PIT, '+')]]
-                        have_no_pit = self.KB.infer(not_alpha)
+                        have_no_pit = self.infer(valid_adj_cell, not_alpha)
 
                         # If we can infer not Pit.
                         if have_no_pit:
                             # Detect no Pit.
-                            self.add_action(Action.DETECT_NO_PIT)
+                            yield self.add_action(Action.DETECT_NO_PIT)
 
                         # If we can not infer not Pit.
                         else:
@@ -451,42 +762,34 @@ class AgentBrain:
         for adj_cell in temp_adj_cell_list:
             valid_adj_cell_list.remove(adj_cell)
         self.agent_cell.update_child_list(valid_adj_cell_list)
-
-        # Move to all of the valid next cells sequentially.
-        for next_cell in self.agent_cell.child_list:
-            self.move_to(next_cell)
-            print("Move to: ", end='')
-            print(self.agent_cell.map_pos)
-            self.append_event_to_output_file('Move to: ' + str(self.agent_cell.map_pos))
-
-            if not self.backtracking_search():
-                return False
-
-            self.move_to(pre_agent_cell)
-            print("Backtrack: ", end='')
-            print(pre_agent_cell.map_pos)
-            self.append_event_to_output_file('Backtrack: ' + str(pre_agent_cell.map_pos))
-
+        self.record_visit()
         return True
 
 
-    def solve_wumpus_world(self):
-        # Reset file output
-        out_file = open(self.output_filename, 'w')
-        out_file.close()
+    def iter_actions(self):
+        # Yields an ActionEvent for every action as soon as the agent decides it and keeps nothing per action, so
+        # a consumer can show the first move at once and follow runs of any length in constant memory.
+        self.trace.open(self.var_table)
+        try:
+            if (yield from self.search()) and self.max_risk is not None:
+                yield from self.risk_search()
 
-        self.backtracking_search()
+            victory_flag = True
+            for cell_row in self.cell_matrix:
+                for cell in cell_row:
+                    if cell.exist_gold() or cell.exist_wumpus():
+                        victory_flag = False
+                        break
+            if victory_flag:
+                yield self.add_action(Action.KILL_ALL_WUMPUS_AND_GRAB_ALL_FOOD)
 
-        victory_flag = True
-        for cell_row in self.cell_matrix:
-            for cell in cell_row:
-                if cell.exist_gold() or cell.exist_wumpus():
-                    victory_flag = False
-                    break
-        if victory_flag:
-            self.add_action(Action.KILL_ALL_WUMPUS_AND_GRAB_ALL_FOOD)
+            if self.agent_cell.parent == self.cave_cell:
+                yield self.add_action(Action.CLIMB_OUT_OF_THE_CAVE)
+        finally:
+            self.trace.close()
+            self.KB.close()
 
-        if self.agent_cell.parent == self.cave_cell:
-            self.add_action(Action.CLIMB_OUT_OF_THE_CAVE)
 
+    def solve_wumpus_world(self):
+        self.action_list = [event.action for event in self.iter_actions()]
         return self.action_list, self.init_agent_cell, self.init_cell_matrix
@@ -11,11 +11,12 @@ class Object(Enum):
 
 
 class Cell:
-    def __init__(self, matrix_pos, map_size, objects_str):
+    def __init__(self, matrix_pos, map_size, objects_str, var_table=None):
         self.matrix_pos = matrix_pos                                            # (0, 0) (0, 1) ... (9, 9)   (TL -> BR)
         self.map_pos = matrix_pos[1] + 1, map_size - matrix_pos[0]              # (1, 1) (1, 2) ... (10, 10) (BL -> TR)
         self.index_pos = map_size * (self.map_pos[1] - 1) + self.map_pos[0]     # 1 2 3 ... 99 100           (BL -> TR)
         self.map_size = map_size
+        self.var_table = var_table                                              # Shared VariableTable of the map.
 
         self.explored = False
         self.percept = [False, False, False, False, False]  # [-G, -P, -W, -B, -S]
@@ -87,26 +88,11 @@ class Cell:
                     break
             if del_stench_flag:
                 stench_cell.percept[4] = False
-                literal = self.get_literal(Object.STENCH, '+')
-                kb.del_clause([literal])
-                literal = self.get_literal(Object.STENCH, '-')
+                # Retract the Stench percept of this cell together with its biconditional, then assert no Stench.
+                kb.retract_group(stench_cell.get_percept_group(Object.STENCH))
+                literal = stench_cell.get_literal(Object.STENCH, '-')
                 kb.add_clause([literal])
 
-                adj_cell_list = stench_cell.get_adj_cell_list(cell_matrix)
-                # S => Wa v Wb v Wc v Wd
-                clause = [stench_cell.get_literal(Object.STENCH, '-')]
-                for adj_cell in adj_cell_list:
-                    clause.append(adj_cell.get_literal(Object.WUMPUS, '+'))
-                kb.del_clause(clause)
-
-                # Wa v Wb v Wc v Wd => S
-                for adj_cell in adj_cell_list:
-                    clause = [stench_cell.get_literal(Object.STENCH, '+'),
-                              adj_cell.get_literal(Object.WUMPUS, '-')]
-                    kb.del_clause(clause)
-
-
-
 
     def get_adj_cell_list(self, cell_matrix):
         adj_cell_list = []
@@ -137,20 +123,12 @@ class Cell:
 
 
     def get_literal(self, obj: Object, sign='+'):    # sign='-': not operator
-        if obj == Object.PIT:
-            i = 1
-        elif obj == Object.WUMPUS:
-            i = 2
-        elif obj == obj.BREEZE:
-            i = 3
-        elif obj == obj.STENCH:
-            i = 4
-        else:
+        if self.var_table is None:
             raise TypeError('Error: ' + self.get_literal.__name__)
+        return self.var_table.get_literal(self.index_pos, obj, sign)
+
 
-        factor = 10 ** len(str(self.map_size * self.map_size))
-        literal = i * factor + self.index_pos
-        if sign == '-':
-            literal *= -1
+    def get_percept_group(self, obj: Object):
+        # Clause group of the KB holding a percept of this cell and the biconditional built from it.
+        return obj.value, self.index_pos
 
-        return literal
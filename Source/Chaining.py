@@ -0,0 +1,141 @@
+FALSUM = 0     # Conclusion of a Horn clause without a positive literal.
+
+
+class ForwardChainer:
+    # Agenda based forward chaining over the Horn clauses of the KB, the atoms are the variables.
+    # A Horn clause has at most one positive literal: [a, -b1, .., -bn] is the rule b1 ^ .. ^ bn => a and
+    # [-b1, .., -bn] is b1 ^ .. ^ bn => FALSUM. Every rule counts its premises not inferred yet and is only
+    # touched when one of them is inferred, so chaining is linear in the total size of the rules.
+    # Non Horn clauses are only counted: while there is none, forward chaining decides every literal query.
+    def __init__(self):
+        self.inferred_set = set()
+        self.count_list = []            # rule -> premises not inferred yet
+        self.conclusion_list = []       # rule -> conclusion atom
+        self.rule_dict = {}             # atom -> [rule, ...] waiting for atom
+        self.non_horn_count = 0
+
+
+    def add_clause(self, clause):
+        conclusion = FALSUM
+        for literal in clause:
+            if literal > 0:
+                if conclusion != FALSUM:
+                    self.non_horn_count += 1
+                    return False
+                conclusion = literal
+
+        rule = len(self.count_list)
+        count = 0
+        for literal in clause:
+            if literal < 0 and -literal not in self.inferred_set:
+                self.rule_dict.setdefault(-literal, []).append(rule)
+                count += 1
+        self.count_list.append(count)
+        self.conclusion_list.append(conclusion)
+        if count == 0:
+            self.infer(conclusion)
+        return True
+
+
+    def infer(self, atom):
+        agenda = [atom]
+        while agenda:
+            atom = agenda.pop()
+            if atom in self.inferred_set:
+                continue
+            self.inferred_set.add(atom)
+            for rule in self.rule_dict.pop(atom, ()):
+                self.count_list[rule] -= 1
+                if self.count_list[rule] == 0:
+                    agenda.append(self.conclusion_list[rule])
+
+
+    def derives_falsum(self, atom):
+        # Chains from atom as an extra fact without touching the counters of the rules.
+        count_dict = {}
+        local_set = set()
+        agenda = [atom]
+        while agenda:
+            atom = agenda.pop()
+            if atom == FALSUM:
+                return True
+            if atom in self.inferred_set or atom in local_set:
+                continue
+            local_set.add(atom)
+            for rule in self.rule_dict.get(atom, ()):
+                count = count_dict.get(rule, self.count_list[rule]) - 1
+                count_dict[rule] = count
+                if count == 0:
+                    agenda.append(self.conclusion_list[rule])
+        return False
+
+
+    def entails(self, literal):
+        # True or False when the Horn clauses decide KB |= literal, None when it is up to the other clauses.
+        # H |= a iff a is inferred, H |= -a iff H ^ a infers FALSUM.
+        if FALSUM in self.inferred_set:
+            return None
+        if literal > 0:
+            if literal in self.inferred_set:
+                return True
+        elif self.derives_falsum(-literal):
+            return True
+        if self.non_horn_count == 0:
+            return False
+        return None
+
+
+class BackwardChainer:
+    # Goal directed proofs over the clauses of a ClauseStore: a literal holds if it is a unit clause, or if some
+    # clause [goal, l1, .., ln] has every -li provable. This is unit resolution run backwards from the goal, so
+    # it is sound but not complete. Proven goals stay proven until a clause is deleted, failed goals are retried
+    # once a clause is added. Failures cut by a cycle or by the depth bound are not memoized.
+    MAX_DEPTH = 8
+
+    def __init__(self, store):
+        self.store = store
+        self.proven_set = set()
+        self.failed_set = set()
+
+
+    def on_add(self):
+        self.failed_set.clear()
+
+    def on_delete(self):
+        self.proven_set.clear()
+        self.failed_set.clear()
+
+
+    def prove(self, goal):
+        return self.search(goal, set(), 0)[0]
+
+
+    def search(self, goal, stack, depth):
+        # Returns (proven, exact), exact is False when the answer depends on a cut.
+        if goal in self.proven_set:
+            return True, True
+        if goal in self.failed_set:
+            return False, True
+        if goal in stack or depth > BackwardChainer.MAX_DEPTH:
+            return False, False
+        if (goal,) in self.store:
+            self.proven_set.add(goal)
+            return True, True
+
+        stack.add(goal)
+        exact = True
+        for clause in list(self.store.occurrences(goal)):
+            for literal in clause:
+                if literal != goal:
+                    proven, sub_exact = self.search(-literal, stack, depth + 1)
+                    exact = exact and sub_exact
+                    if not proven:
+                        break
+            else:
+                stack.discard(goal)
+                self.proven_set.add(goal)
+                return True, True
+        stack.discard(goal)
+        if exact:
+            self.failed_set.add(goal)
+        return False, exact
@@ -0,0 +1,74 @@
+class ClauseStore:
+    # Canonical clauses are sorted tuples of distinct literals. Every live clause is interned, so equal clauses
+    # share one object and the occurrence index only holds references.
+    # add() and discard() return the interned clause, or None when nothing changed.
+    def __init__(self):
+        self.clause_dict = {}           # clause -> clause, insertion ordered.
+        self.occurrence_dict = {}       # literal -> {clause: None}, insertion ordered.
+        # clause -> 1 added, -1 removed or 0 removed and added back since the trace last took the journal, None
+        # while nobody reads it. A clause added and removed again in between cancels out. The entries of added
+        # clauses follow the order of their last addition, so replaying the removals then the additions (0 is
+        # both) rebuilds clause_dict in its own order.
+        self.journal = None
+
+
+    @staticmethod
+    def canonical(clause):
+        return tuple(sorted(set(clause)))
+
+
+    def add(self, clause):
+        clause = self.canonical(clause)
+        if clause in self.clause_dict:
+            return None
+        self.clause_dict[clause] = clause
+        for literal in clause:
+            self.occurrence_dict.setdefault(literal, {})[clause] = None
+        if self.journal is not None:
+            self.note(clause, 1)
+        return clause
+
+
+    def discard(self, clause):
+        clause = self.canonical(clause)
+        clause = self.clause_dict.pop(clause, None)
+        if clause is None:
+            return None
+        for literal in clause:
+            occurrence = self.occurrence_dict[literal]
+            del occurrence[clause]
+            if not occurrence:
+                del self.occurrence_dict[literal]
+        if self.journal is not None:
+            self.note(clause, -1)
+        return clause
+
+
+    def note(self, clause, change):
+        previous = self.journal.pop(clause, None)
+        if previous is None:
+            self.journal[clause] = change
+        elif previous < 0:
+            self.journal[clause] = 0        # Back in the store, at its end.
+        elif previous == 0:
+            self.journal[clause] = -1
+
+
+    def occurrences(self, literal):
+        return self.occurrence_dict.get(literal, {}).keys()
+
+
+    def __contains__(self, clause):
+        return self.canonical(clause) in self.clause_dict
+
+    def __iter__(self):
+        return iter(self.clause_dict)
+
+    def __len__(self):
+        return len(self.clause_dict)
+
+    def __str__(self):
+        # Same layout as the former list of sorted lists, the output traces rely on it.
+        return str([list(clause) for clause in self.clause_dict])
+
+    __repr__ = __str__
@@ -0,0 +1,82 @@
+class VariableComponents:
+    # Union-find over the variables of the KB. Two variables share a component when a chain of clauses links them,
+    # so a query about a variable only depends on the clauses of its component.
+    # Deleting clauses never splits a component, which only makes the partition coarser, never wrong.
+    def __init__(self):
+        self.parent_dict = {}
+        self.size_dict = {}         # root -> number of variables
+        self.clause_dict = {}       # root -> {clause: None}
+        self.add_stamp_dict = {}    # root -> KB version of the latest clause added to the component
+        self.del_stamp_dict = {}    # root -> KB version of the latest clause deleted from the component
+
+        # Called as merge_listener(root, absorbed_root) before two components are merged.
+        self.merge_listener = None
+
+
+    def __contains__(self, var):
+        return var in self.parent_dict
+
+
+    def find(self, var):
+        root = var
+        parent_dict = self.parent_dict
+        while parent_dict[root] != root:
+            root = parent_dict[root]
+        while parent_dict[var] != root:
+            parent_dict[var], var = root, parent_dict[var]
+        return root
+
+
+    def make(self, var):
+        if var not in self.parent_dict:
+            self.parent_dict[var] = var
+            self.size_dict[var] = 1
+            self.clause_dict[var] = {}
+            self.add_stamp_dict[var] = 0
+            self.del_stamp_dict[var] = 0
+
+
+    def union(self, root_a, root_b):
+        if root_a == root_b:
+            return root_a
+        if self.size_dict[root_a] < self.size_dict[root_b]:
+            root_a, root_b = root_b, root_a
+        if self.merge_listener is not None:
+            self.merge_listener(root_a, root_b)
+
+        self.parent_dict[root_b] = root_a
+        self.size_dict[root_a] += self.size_dict.pop(root_b)
+        clause_dict_a = self.clause_dict[root_a]
+        clause_dict_b = self.clause_dict.pop(root_b)
+        if len(clause_dict_a) < len(clause_dict_b):
+            clause_dict_a, clause_dict_b = clause_dict_b, clause_dict_a
+        clause_dict_a.update(clause_dict_b)
+        self.clause_dict[root_a] = clause_dict_a
+        self.add_stamp_dict[root_a] = max(self.add_stamp_dict[root_a], self.add_stamp_dict.pop(root_b))
+        self.del_stamp_dict[root_a] = max(self.del_stamp_dict[root_a], self.del_stamp_dict.pop(root_b))
+        return root_a
+
+
+    def link_clause(self, clause, version=None):
+        # version=None leaves the stamps alone, for rewrites that keep the KB equivalent.
+        root = None
+        for literal in clause:
+            var = abs(literal)
+            self.make(var)
+            var_root = self.find(var)
+            root = var_root if root is None else self.union(root, var_root)
+        if root is not None:
+            self.clause_dict[root][clause] = None
+            if version is not None:
+                self.add_stamp_dict[root] = version
+        return root
+
+
+    def unlink_clause(self, clause, version=None):
+        if clause:
+            root = self.find(abs(clause[0]))
+            self.clause_dict[root].pop(clause, None)
+            if version is not None:
+                self.del_stamp_dict[root] = version
+            return root
+        return None
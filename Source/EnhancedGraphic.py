@@ -8,6 +8,7 @@ from Map import *
 from Agent import *
 from Graphic import *
 from Algorithms import *
+import SolverWorker
 
 @dataclass
 class GameColors:
@@ -108,6 +109,26 @@ class EnhancedGraphic(Graphic):
         self.score_animation = {'current': 0, 'target': 0}
         self.setup_buttons()
         self.action_text = ""  # Store action feedback
+        # Solve every menu map in the background while the home screen is shown.
+        self.presolve_pool = SolverWorker.PresolvePool(self.result_cache)
+        self.presolve_maps()
+
+    def presolve_maps(self):
+        # The map directory is scanned on every call, MAP_LIST here is the one imported at startup.
+        input_dir = os.path.join(BASE_DIR, "Assets", "Input")
+        output_dir = os.path.join(BASE_DIR, "Assets", "Output")
+        for map_name in sorted(os.listdir(input_dir)):
+            if map_name == "custom_map.txt":
+                output_name = "custom_result.txt"
+            elif map_name.startswith("map_") and map_name.endswith(".txt"):
+                output_name = "result_" + map_name[len("map_"):]
+            else:
+                continue
+            self.presolve_pool.submit(os.path.join(input_dir, map_name), os.path.join(output_dir, output_name))
+
+    def reload_maps(self):
+        super().reload_maps()
+        self.presolve_maps()  # The editor may have added maps or changed the custom map
         
     def setup_buttons(self):
         self.buttons = []
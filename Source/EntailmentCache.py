@@ -0,0 +1,60 @@
+class EntailmentCache:
+    # Memoizes KB |= literal. An entry is stamped with the KB version it was computed at and stays valid while its
+    # variable's component has not changed in the relevant direction: adding clauses can only create entailments,
+    # deleting clauses can only remove them. Entailed literals are promoted to unit facts, which answer queries
+    # on both polarities of their variable. This relies on a consistent KB, as built from a valid map.
+    def __init__(self, components):
+        self.components = components
+        self.fact_dict = {}             # var -> (literal, version)
+        self.not_entailed_dict = {}     # literal -> version
+
+        self.hit_count = 0
+        self.miss_count = 0
+
+
+    def get_stamps(self, var):
+        if var not in self.components:
+            return 0, 0
+        root = self.components.find(var)
+        return self.components.add_stamp_dict[root], self.components.del_stamp_dict[root]
+
+
+    def lookup(self, literal, count=True):
+        var = abs(literal)
+        add_stamp, del_stamp = self.get_stamps(var)
+
+        fact = self.fact_dict.get(var)
+        if fact is not None:
+            if fact[1] >= del_stamp:
+                self.hit_count += count
+                return fact[0] == literal
+            del self.fact_dict[var]
+
+        version = self.not_entailed_dict.get(literal)
+        if version is not None:
+            if version >= add_stamp:
+                self.hit_count += count
+                return False
+            del self.not_entailed_dict[literal]
+
+        self.miss_count += count
+        return None
+
+
+    def is_decided(self, var):
+        # Both polarities of var have a valid answer.
+        return self.lookup(var, False) is not None and self.lookup(-var, False) is not None
+
+
+    def store(self, literal, result, version):
+        if result:
+            self.fact_dict[abs(literal)] = (literal, version)
+            self.not_entailed_dict.pop(-literal, None)
+        else:
+            self.not_entailed_dict[literal] = version
+
+
+    def get_stats(self):
+        return {'cache_hits': self.hit_count,
+                'cache_misses': self.miss_count,
+                'facts': len(self.fact_dict)}
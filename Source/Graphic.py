@@ -4,6 +4,8 @@ import os
 from Map import *
 from Agent import *
 import Algorithms
+import ResultCache
+import SolverWorker
 from Specification import *  
 
 class Graphic:
@@ -32,6 +34,8 @@ class Graphic:
         self.bg = pygame.image.load(bg_path).convert()
         self.bg = pygame.transform.scale(self.bg, (SCREEN_WIDTH, SCREEN_HEIGHT))
         self.direct = 3
+        self.result_cache = ResultCache.ResultCache()     # A map solved before replays at once.
+        self.presolve_pool = None                         # A SolverWorker.PresolvePool solving maps ahead.
 
     def home_draw(self):
         screen_width, screen_height = self.screen.get_size()
@@ -156,11 +160,25 @@ class Graphic:
                         continue
                     
                     # Pass the file path instead of parsed map data
-                    action_list, cave_cell, cell_matrix = Algorithms.AgentBrain(custom_map_path, custom_output).solve_wumpus_world()
+                    solver = SolverWorker.SolverProcess(custom_map_path, custom_output, self.result_cache,
+                                                        self.presolve_pool).start()
                 else:
                     # Use regular map
-                    action_list, cave_cell, cell_matrix = Algorithms.AgentBrain(MAP_LIST[self.map_i - 1], OUTPUT_LIST[self.map_i - 1]).solve_wumpus_world()
-                
+                    solver = SolverWorker.SolverProcess(MAP_LIST[self.map_i - 1], OUTPUT_LIST[self.map_i - 1],
+                                                        self.result_cache, self.presolve_pool).start()
+
+                # The solve runs in a worker process and its actions are drawn as they arrive, ESC cancels it.
+                init_state = solver.get_init_state()
+                while init_state is None and not solver.done and self.poll_solver_events(solver):
+                    init_state = solver.get_init_state(0.05)
+                if init_state is None:
+                    if solver.error:
+                        print("Solver error:", solver.error)
+                    solver.cancel()
+                    self.state = MAP
+                    continue
+                cave_cell, cell_matrix = init_state
+
                 map_pos = cave_cell.map_pos
             # ... rest of the code remains unchanged
 
@@ -169,6 +187,7 @@ class Graphic:
                 self.gold = Gold()
                 self.agent = Agent(len(cell_matrix) - map_pos[1] + 1, map_pos[0])
                 self.agent.load_image()
+                self.direct = 3     # A new run starts facing right, like the Agent image and AgentBrain.heading.
                 self.all_sprites = pygame.sprite.Group()
                 self.all_sprites.add(self.agent)
 
@@ -194,7 +213,10 @@ class Graphic:
 
                 self.running_draw()
 
-                for action in action_list:
+                while not solver.is_finished() and self.poll_solver_events(solver):
+                    action = solver.next_action(0.01)
+                    if action is None:
+                        continue
                     pygame.time.delay(SPEED)
                     self.display_action(action)
 
@@ -205,12 +227,9 @@ class Graphic:
                         self.state = GAMEOVER
                         break
 
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            pygame.quit()
-                            sys.exit()
-                        # elif event.type == pygame.USEREVENT:
-                        #     self.action_text = ""
+                if solver.error:
+                    print("Solver error:", solver.error)
+                solver.cancel()
 
             elif self.state == WIN or self.state == TRYBEST:
                 self.win_draw()
@@ -218,6 +237,21 @@ class Graphic:
 
             self.clock.tick(60)
 
+    def poll_solver_events(self, solver):
+        # Keeps the window responsive while the worker solves. Returns False once the user cancelled with ESC.
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                solver.cancel()
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                solver.cancel()
+                self.state = MAP
+                return False
+            # elif event.type == pygame.USEREVENT:
+            #     self.action_text = ""
+        return True
+
    
     def win_draw(self):
         # Fill with new background color
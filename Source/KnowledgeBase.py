@@ -1,37 +1,632 @@
-from pysat.solvers import Glucose3
-import copy
+import time
 
-class KnowledgeBase:
+import SolverBackends
+from Chaining import BackwardChainer, ForwardChainer
+from ClauseStore import ClauseStore
+from Components import VariableComponents
+from EntailmentCache import EntailmentCache
+from Propagator import UnitPropagator
+
+
+class SolverSession:
+    # A long-lived solver holding the clauses of one variable component of the KB. The solver numbers the
+    # variables densely in the order they show up, so its size and the models it returns follow the component
+    # instead of the whole map.
+    def __init__(self, solver):
+        self.solver = solver
+        self.selector_dict = {}     # group -> solver selector of the active groups with clauses in this component
+        self.local_dict = {}        # KB var -> solver var
+
+    def get_local(self, literal):
+        var = abs(literal)
+        local = self.local_dict.get(var)
+        if local is None:
+            local = self.local_dict[var] = len(self.local_dict) + 1
+        return local if literal > 0 else -local
+
+    def add_clause(self, clause, group=None, selector=None):
+        local_clause = [self.get_local(literal) for literal in clause]
+        if group is not None:
+            selector = self.get_local(selector)
+            local_clause.append(-selector)
+            self.selector_dict[group] = selector
+        self.solver.add_clause(local_clause)
+
+    def retract(self, group):
+        # Asserts -s for the selector of group, returns False when no clause of group is in this session.
+        selector = self.selector_dict.pop(group, None)
+        if selector is None:
+            return False
+        self.solver.add_clause([-selector])
+        return True
+
+    def solve(self, assumption_list):
+        return self.solver.solve(assumptions=[self.get_local(literal) for literal in assumption_list] +
+                                 list(self.selector_dict.values()))
+
+    def get_model(self):
+        return self.solver.get_model()
+
+    def get_model_literal(self, model, var):
+        # Variables the solver has never seen are free, any value is a model.
+        local = self.local_dict.get(var)
+        if local is None or local > len(model):
+            return -var
+        return var if model[local - 1] > 0 else -var
+
+    def delete(self):
+        self.solver.delete()
+
+
+class InferenceEngines:
+    # The forward chainer and unit propagator of one variable component. Both only ever grow, a component that
+    # loses a clause gets new engines.
     def __init__(self):
-        self.KB = []
+        self.forward_chainer = ForwardChainer()
+        self.propagator = UnitPropagator()
+
+    def add_clause(self, clause):
+        self.forward_chainer.add_clause(clause)
+        self.propagator.add_clause(clause)
+
+
+class KnowledgeBase:
+    INCREMENTAL = 'incremental'     # Long-lived solver sessions per component, queries answered with assumptions.
+    REFERENCE = 'reference'         # A fresh solver per query (the original implementation).
+    MODE_LIST = [INCREMENTAL, REFERENCE]
+    GC_THRESHOLD = 1000             # Default KB size that triggers simplify() in the incremental mode.
+
+    def __init__(self, mode=INCREMENTAL, first_free_var=1, solver_name=SolverBackends.DEFAULT_BACKEND,
+                 gc_threshold=GC_THRESHOLD):
+        if mode not in KnowledgeBase.MODE_LIST:
+            raise TypeError('Error: Unknown KnowledgeBase mode ' + str(mode) + '.')
+        self.mode = mode
+        self.solver_name = solver_name
+        self.solver_factory = SolverBackends.get_backend(solver_name)
+        self.KB = ClauseStore()
+        self.version = 0                # Bumped on every change of the KB.
+        self.components = VariableComponents()
+        self.components.merge_listener = self.merge_components
+        self.cache = EntailmentCache(self.components)
+
+        # Retractable clause groups. Every clause of a group is guarded by the group's selector literal s as
+        # (C v -s). Queries assume s for every active group, retracting a group asserts -s for good.
+        self.next_free_var = first_free_var
+        self.group_dict = {}            # group -> [selector, [clause, ...]]
+        self.clause_group_dict = {}     # clause -> group
+        self.active_selector_dict = {}  # group -> selector
+
+        # Forward chaining answers the queries the Horn clauses decide, unit propagation the ones it implies.
+        # Their engines are kept per component root like the solver sessions: a component that loses a clause
+        # drops its engines and they are rebuilt from its clauses before its next query.
+        self.engine_dict = {}
+        self.backward_chainer = BackwardChainer(self.KB)
+
+        # Solver sessions are keyed by component root and built lazily, so a query only ships the clauses
+        # connected to its variables. Merging components feeds the smaller one to the larger session.
+        self.session_dict = {}
+
+        # Simplification and garbage collection, see simplify().
+        self.gc_threshold = gc_threshold
+        self.gc_limit = gc_threshold
+        self.substituted_set = set()    # Permanent unit literals already substituted into other clauses.
+        # Clauses as the caller gave them that the KB does not hold as such any more: strengthened or dropped by
+        # the rewrite, or dropping others they subsume. del_clause() can not take them back.
+        self.rewritten_set = set()
+        self.retired_set = set()        # Variables the caller will not ask about directly any more.
+        self.settled_dict = {}          # var -> literal of the collected units of retired variables
+
+        self.query_count = 0
+        self.query_time = 0.0
+        self.session_build_count = 0
+        self.engine_build_count = 0
+        self.retract_count = 0
+        self.chaining_count = 0         # Queries decided by forward chaining.
+        self.propagation_count = 0      # Queries decided by unit propagation.
+        self.proof_count = 0            # Goals proven by backward chaining.
+        self.prove_time = 0.0
+        self.solver_count = 0           # Queries that needed the SAT solver.
+        self.backbone_call_count = 0    # Solver calls made by compute_backbone.
+        self.backbone_time = 0.0
+        self.simplify_count = 0
+        self.simplify_time = 0.0
+        self.peak_clause_count = 0
 
 
     @staticmethod
     def standardize_clause(clause):
-        return sorted(list(set(clause)))
+        return ClauseStore.canonical(clause)
 
 
-    def add_clause(self, clause):
-        clause = self.standardize_clause(clause)
-        if clause not in self.KB:
-            self.KB.append(clause)
+    def new_var(self):
+        var = self.next_free_var
+        self.next_free_var += 1
+        return var
+
+
+    def add_clause(self, clause, group=None):
+        if self.settled_dict:
+            self.restore_settled(clause)
+        if self.substituted_set:
+            # Keep the KB simplified: a clause satisfied by a permanent unit is entailed already.
+            if any(literal in self.substituted_set for literal in clause):
+                self.rewritten_set.add(self.standardize_clause(clause))
+                return
+            strengthened = [literal for literal in clause if -literal not in self.substituted_set] or clause
+            if len(strengthened) != len(clause):
+                self.rewritten_set.update([self.standardize_clause(clause), self.standardize_clause(strengthened)])
+            clause = strengthened
+        clause = self.KB.add(clause)
+        if clause is None:
+            return
+        self.version += 1
+        root = self.components.link_clause(clause, self.version)
+        if root in self.engine_dict:
+            self.engine_dict[root].add_clause(clause)
+        self.backward_chainer.on_add()
+
+        if group is None:
+            if root in self.session_dict:
+                self.session_dict[root].add_clause(clause)
+            self.after_add()
+            return
+
+        if group not in self.group_dict:
+            selector = self.new_var()
+            self.group_dict[group] = [selector, []]
+            self.active_selector_dict[group] = selector
+        elif group not in self.active_selector_dict:
+            raise TypeError('Error: The clause group ' + str(group) + ' has already been retracted.')
+        selector, clause_list = self.group_dict[group]
+        clause_list.append(clause)
+        self.clause_group_dict[clause] = group
+        if root in self.session_dict:
+            self.session_dict[root].add_clause(clause, group, selector)
+        self.after_add()
+
+
+    def after_add(self):
+        if len(self.KB) > self.peak_clause_count:
+            self.peak_clause_count = len(self.KB)
+        if self.mode == KnowledgeBase.INCREMENTAL and len(self.KB) > self.gc_limit:
+            self.simplify()
+            # The next run waits for gc_threshold new clauses, or for as many as survived when that is more. A
+            # run costs the size of the KB, so its cost is spread over as many additions and stays constant per
+            # clause on any map. The peak stays within twice what survives plus gc_threshold.
+            self.gc_limit = len(self.KB) + max(self.gc_threshold, len(self.KB))
 
 
     def del_clause(self, clause):
         clause = self.standardize_clause(clause)
-        if clause in self.KB:
-            self.KB.remove(clause)
+        if clause in self.rewritten_set or (len(clause) == 1 and clause[0] in self.substituted_set):
+            raise TypeError('Error: The clause ' + str(list(clause)) + ' has been simplified into the KB. '
+                            'Add it with a clause group to retract it.')
+        clause = self.KB.discard(clause)
+        if clause is not None:
+            self.version += 1
+            root = self.components.unlink_clause(clause, self.version)
+            # A SAT solver can not forget a clause, so the session of the component is rebuilt lazily.
+            # Use a clause group when a clause has to be retracted often.
+            session = self.session_dict.pop(root, None)
+            if session is not None:
+                session.delete()
+            self.engine_dict.pop(root, None)
+            self.backward_chainer.on_delete()
+            group = self.clause_group_dict.pop(clause, None)
+            if group is not None:
+                self.group_dict[group][1].remove(clause)
+
+
+    def retract_group(self, group):
+        selector = self.active_selector_dict.pop(group, None)
+        if selector is None:
+            return
+        self.version += 1
+        for clause in self.group_dict[group][1]:
+            self.KB.discard(clause)
+            root = self.components.unlink_clause(clause, self.version)
+            del self.clause_group_dict[clause]
+            session = self.session_dict.get(root)
+            if session is not None:
+                session.retract(group)
+            self.engine_dict.pop(root, None)
+        self.group_dict[group][1] = []
+        self.backward_chainer.on_delete()
+        self.retract_count += 1
 
 
     def infer(self, not_alpha):
-        g = Glucose3()
-        clause_list = copy.deepcopy(self.KB)
+        start = time.perf_counter()
+        if self.mode == KnowledgeBase.REFERENCE or any(len(clause) != 1 for clause in not_alpha):
+            result = self.infer_reference(not_alpha)
+        elif len(not_alpha) == 1:
+            # Single literal query: KB |= alpha where not_alpha = [[-alpha]].
+            alpha = -not_alpha[0][0]
+            result = self.lookup_settled(alpha)
+            if result is None:
+                result = self.cache.lookup(alpha)
+            if result is None:
+                engines = self.get_engines(abs(alpha))
+                result = engines.forward_chainer.entails(alpha)
+                if result is not None:
+                    self.chaining_count += 1
+                else:
+                    result = engines.propagator.entails(alpha)
+                    if result is not None:
+                        self.propagation_count += 1
+                    else:
+                        result = self.infer_incremental(not_alpha)
+                        self.solver_count += 1
+                self.cache.store(alpha, result, self.version)
+        else:
+            result = self.infer_incremental(not_alpha)
+        self.query_time += time.perf_counter() - start
+        self.query_count += 1
+        return result
+
+
+    def infer_reference(self, not_alpha):
+        g = self.solver_factory()
         negative_alpha = not_alpha
-        for it in clause_list:
+        for it in self.KB:
             g.add_clause(it)
+        for literal in self.settled_dict.values():
+            g.add_clause([literal])
         for it in negative_alpha:
             g.add_clause(it)
         sol = g.solve()
+        g.delete()
         if sol:
             return False
         return True
+
+
+    def get_engines(self, var):
+        # Engines of the component of var. Components share no variable, so they decide queries about var as
+        # well as engines over the whole KB would. A var no clause mentions gets empty engines.
+        if var not in self.components:
+            return InferenceEngines()
+        root = self.components.find(var)
+        engines = self.engine_dict.get(root)
+        if engines is None:
+            engines = InferenceEngines()
+            for clause in self.components.clause_dict[root]:
+                engines.add_clause(clause)
+            self.engine_dict[root] = engines
+            self.engine_build_count += 1
+        return engines
+
+
+    def infer_by_propagation(self, alpha):
+        return self.get_engines(abs(alpha)).propagator.entails(alpha)
+
+
+    def prove(self, goal_list):
+        # Goal query: does the KB entail every literal of goal_list? Backward chaining answers most of them
+        # from the unit and binary percept clauses, infer() settles the rest.
+        start = time.perf_counter()
+        result = True
+        for goal in goal_list:
+            proven = self.lookup_settled(goal)
+            if proven is None and self.backward_chainer.prove(goal):
+                proven = True
+                self.proof_count += 1
+            if proven is None:
+                proven = self.infer([[-goal]])
+            if not proven:
+                result = False
+                break
+        self.prove_time += time.perf_counter() - start
+        return result
+
+
+    def infer_incremental(self, not_alpha):
+        # KB ^ -alpha is unsatisfiable iff KB entails alpha. Components share no variable, so the conjunction
+        # is unsatisfiable iff one of the components touched by -alpha is.
+        assumption_dict = {}    # root -> assumptions
+        for clause in not_alpha:
+            var = abs(clause[0])
+            settled = self.settled_dict.get(var)
+            if settled is not None:
+                if settled != clause[0]:
+                    return True
+            elif var in self.components:
+                assumption_dict.setdefault(self.components.find(var), []).append(clause[0])
+        for root, assumption_list in assumption_dict.items():
+            if not self.get_session(root).solve(assumption_list):
+                return True
+        return False
+
+
+    def get_session(self, root):
+        session = self.session_dict.get(root)
+        if session is None:
+            session = SolverSession(self.solver_factory())
+            self.feed_session(session, self.components.clause_dict[root])
+            self.session_dict[root] = session
+            self.session_build_count += 1
+        return session
+
+
+    def feed_session(self, session, clause_dict):
+        for clause in clause_dict:
+            group = self.clause_group_dict.get(clause)
+            if group is None:
+                session.add_clause(clause)
+            else:
+                session.add_clause(clause, group, self.group_dict[group][0])
+
+
+    def merge_components(self, root, absorbed_root):
+        self.merge_sessions(root, absorbed_root)
+        self.merge_engines(root, absorbed_root)
+
+
+    def merge_sessions(self, root, absorbed_root):
+        session = self.session_dict.pop(root, None)
+        absorbed_session = self.session_dict.pop(absorbed_root, None)
+        clause_dict = self.components.clause_dict[root]
+        absorbed_clause_dict = self.components.clause_dict[absorbed_root]
+        if session is None and absorbed_session is None:
+            return
+
+        # Keep the session of the larger component and feed it the clauses of the other one.
+        if session is None or (absorbed_session is not None and len(absorbed_clause_dict) > len(clause_dict)):
+            session, absorbed_session = absorbed_session, session
+            clause_dict, absorbed_clause_dict = absorbed_clause_dict, clause_dict
+        if absorbed_session is not None:
+            absorbed_session.delete()
+        self.feed_session(session, absorbed_clause_dict)
+        self.session_dict[root] = session
+
+
+    def merge_engines(self, root, absorbed_root):
+        # Same as merge_sessions(): the engines only grow, so the larger side is kept and fed the other clauses.
+        engines = self.engine_dict.pop(root, None)
+        absorbed_engines = self.engine_dict.pop(absorbed_root, None)
+        clause_dict = self.components.clause_dict[root]
+        absorbed_clause_dict = self.components.clause_dict[absorbed_root]
+        if engines is None and absorbed_engines is None:
+            return
+        if engines is None or (absorbed_engines is not None and len(absorbed_clause_dict) > len(clause_dict)):
+            engines = absorbed_engines
+            absorbed_clause_dict = clause_dict
+        for clause in absorbed_clause_dict:
+            engines.add_clause(clause)
+        self.engine_dict[root] = engines
+
+
+    def compute_backbone(self, var_list):
+        # Decides KB |= v and KB |= -v for every var of var_list in one solver pass and stores the answers in
+        # the entailment cache. Every model found rules out all the candidates it disagrees with at once.
+        # Returns {var: the entailed literal of var, or None}.
+        start = time.perf_counter()
+        backbone_dict = self.find_backbone(var_list)
+        self.backbone_time += time.perf_counter() - start
+        return backbone_dict
+
+
+    def find_backbone(self, var_list):
+        backbone_dict = {}
+        candidate_list = []
+        for var in var_list:
+            if var in self.settled_dict:
+                backbone_dict[var] = self.settled_dict[var]
+                continue
+            if self.cache.is_decided(var):
+                if self.cache.lookup(var, False):
+                    backbone_dict[var] = var
+                elif self.cache.lookup(-var, False):
+                    backbone_dict[var] = -var
+                else:
+                    backbone_dict[var] = None
+                continue
+            literal = var
+            if not self.infer_by_propagation(literal):
+                literal = -var
+                if not self.infer_by_propagation(literal):
+                    candidate_list.append(var)
+                    continue
+            self.cache.store(literal, True, self.version)
+            backbone_dict[var] = literal
+        if not candidate_list:
+            return backbone_dict
+
+        # Components share no variable, so the backbone of each is computed on its own session.
+        candidate_list_dict = {}    # root -> candidate vars
+        for var in candidate_list:
+            if var in self.components:
+                candidate_list_dict.setdefault(self.components.find(var), []).append(var)
+            else:
+                # No clause mentions var, it is free.
+                self.cache.store(var, False, self.version)
+                self.cache.store(-var, False, self.version)
+                backbone_dict[var] = None
+        for root, var_list in candidate_list_dict.items():
+            self.find_component_backbone(self.get_session(root), var_list, backbone_dict)
+        return backbone_dict
+
+
+    def find_component_backbone(self, session, candidate_list, backbone_dict):
+        self.backbone_call_count += 1
+        if not session.solve([]):
+            # An inconsistent KB entails everything, leave the answers to infer().
+            return
+        model = session.get_model()
+
+        # Candidate literals: the value of each var in the current model.
+        candidate_dict = {var: session.get_model_literal(model, var) for var in candidate_list}
+        while candidate_dict:
+            var, literal = next(iter(candidate_dict.items()))
+            self.backbone_call_count += 1
+            if session.solve([-literal]):
+                model = session.get_model()
+                for other_var, other_literal in list(candidate_dict.items()):
+                    if session.get_model_literal(model, other_var) != other_literal:
+                        del candidate_dict[other_var]
+                        self.cache.store(other_var, False, self.version)
+                        self.cache.store(-other_var, False, self.version)
+                        backbone_dict[other_var] = None
+            else:
+                del candidate_dict[var]
+                self.cache.store(literal, True, self.version)
+                backbone_dict[var] = literal
+
+
+    def lookup_settled(self, literal):
+        settled = self.settled_dict.get(abs(literal))
+        if settled is None:
+            return None
+        return settled == literal
+
+
+    def restore_settled(self, clause):
+        # A new clause mentions a collected variable, put its unit back so that sessions see it again.
+        for literal in clause:
+            settled = self.settled_dict.pop(abs(literal), None)
+            if settled is not None:
+                # An added unit, the engines of its component just take it.
+                clause = self.insert_clause((settled,), None)
+                root = self.components.find(abs(settled))
+                session = self.session_dict.pop(root, None)
+                if session is not None:
+                    session.delete()
+                if clause is not None and root in self.engine_dict:
+                    self.engine_dict[root].add_clause(clause)
+
+
+    def retire_vars(self, var_list):
+        # The caller promises not to care about these variables any more except through lookups. Once their
+        # value is settled by a unit and they appear nowhere else, simplify() collects them.
+        if self.mode == KnowledgeBase.INCREMENTAL:
+            self.retired_set.update(var_list)
+
+
+    def simplify(self):
+        # Equivalence preserving rewrite of the KB:
+        #   1. substitute the permanent (ungrouped) unit clauses: drop satisfied clauses, strengthen the others,
+        #   2. drop clauses subsumed by a permanent clause or by a clause of the same group,
+        #   3. collect the units of retired variables that appear in no other clause.
+        # A grouped unit is never substituted since retracting its group would make the rewrite unsound.
+        start = time.perf_counter()
+        size = len(self.KB)
+
+        unit_dict = {}      # var -> literal
+        for clause in self.KB:
+            if len(clause) == 1 and clause not in self.clause_group_dict:
+                unit_dict[abs(clause[0])] = clause[0]
+        queue = list(unit_dict.values())
+        while queue:
+            literal = queue.pop()
+            unit = (literal,)
+            for clause in list(self.KB.occurrences(literal)):
+                if clause != unit:
+                    self.drop_clause(clause)
+                    self.rewritten_set.add(clause)
+            for clause in list(self.KB.occurrences(-literal)):
+                strengthened = tuple(other for other in clause if other != -literal)
+                if not strengthened:
+                    continue        # The KB is inconsistent, leave it to the solver.
+                group = self.clause_group_dict.get(clause)
+                if strengthened in self.KB:
+                    # The strengthened clause must stay as permanent as the one it replaces.
+                    existing_group = self.clause_group_dict.get(strengthened)
+                    if existing_group != group:
+                        if group is not None:
+                            continue
+                        self.clause_group_dict.pop(strengthened)
+                        self.group_dict[existing_group][1].remove(strengthened)
+                self.drop_clause(clause)
+                self.rewritten_set.update([clause, strengthened])
+                self.insert_clause(strengthened, group)
+                if len(strengthened) == 1 and strengthened not in self.clause_group_dict:
+                    var = abs(strengthened[0])
+                    if var not in unit_dict:
+                        unit_dict[var] = strengthened[0]
+                        queue.append(strengthened[0])
+            self.substituted_set.add(literal)
+
+        for clause in sorted(self.KB, key=len):
+            if clause not in self.KB:
+                continue
+            group = self.clause_group_dict.get(clause)
+            literal = min(clause, key=lambda x: len(self.KB.occurrences(x)))
+            clause_set = set(clause)
+            for other in list(self.KB.occurrences(literal)):
+                if len(other) > len(clause) and (group is None or self.clause_group_dict.get(other) == group) \
+                        and clause_set.issubset(other):
+                    self.drop_clause(other)
+                    self.rewritten_set.update([clause, other])
+
+        for var in list(self.retired_set):
+            literal = unit_dict.get(var)
+            if literal is None or (literal,) not in self.KB:
+                continue
+            if len(self.KB.occurrences(literal)) == 1 and not self.KB.occurrences(-literal):
+                self.drop_clause((literal,))
+                self.settled_dict[var] = literal
+                self.retired_set.discard(var)
+
+        # The rewrite keeps the KB equivalent, cached answers stay valid, solver state and engines are rebuilt
+        # lazily for the components queried next.
+        for session in self.session_dict.values():
+            session.delete()
+        self.session_dict = {}
+        self.engine_dict = {}
+        self.backward_chainer.on_delete()
+
+        self.simplify_count += 1
+        self.simplify_time += time.perf_counter() - start
+        return size - len(self.KB)
+
+
+    def drop_clause(self, clause):
+        self.KB.discard(clause)
+        self.components.unlink_clause(clause)
+        group = self.clause_group_dict.pop(clause, None)
+        if group is not None:
+            self.group_dict[group][1].remove(clause)
+
+
+    def insert_clause(self, clause, group):
+        clause = self.KB.add(clause)
+        if clause is not None:
+            self.components.link_clause(clause)
+            if group is not None:
+                self.group_dict[group][1].append(clause)
+                self.clause_group_dict[clause] = group
+        return clause
+
+
+    def get_stats(self):
+        stats = {'mode': self.mode,
+                 'solver': self.solver_name,
+                 'queries': self.query_count,
+                 'query_time': self.query_time,
+                 'avg_query_time': self.query_time / self.query_count if self.query_count else 0.0,
+                 'sessions': len(self.session_dict),
+                 'session_builds': self.session_build_count,
+                 'engine_builds': self.engine_build_count,
+                 'retracts': self.retract_count,
+                 'clauses': len(self.KB),
+                 'implied_literals': sum(len(engines.propagator.trail) for engines in self.engine_dict.values()),
+                 'resolved_by_cache': self.cache.hit_count,
+                 'resolved_by_chaining': self.chaining_count,
+                 'resolved_by_propagation': self.propagation_count,
+                 'resolved_by_solver': self.solver_count,
+                 'backbone_solver_calls': self.backbone_call_count,
+                 'backbone_time': self.backbone_time,
+                 'goal_proofs': self.proof_count,
+                 'prove_time': self.prove_time,
+                 'peak_clauses': self.peak_clause_count,
+                 'simplify_runs': self.simplify_count,
+                 'simplify_time': self.simplify_time,
+                 'settled_vars': len(self.settled_dict)}
+        stats.update(self.cache.get_stats())
+        return stats
+
+
+    def close(self):
+        for session in self.session_dict.values():
+            session.delete()
+        self.session_dict = {}
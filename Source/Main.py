@@ -1,5 +1,7 @@
 from Graphic import *
 from EnhancedGraphic import *
 
-app = EnhancedGraphic()
-app.run()
+# The solver worker is a spawned process that imports this module again, it must not open a second window.
+if __name__ == '__main__':
+    app = EnhancedGraphic()
+    app.run()
@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+import numpy as np
+
+# np.strings is NumPy 2.0+, np.char has the same functions on NumPy 1.x.
+np_strings = np.strings if hasattr(np, 'strings') else np.char
+
+# One boolean array per object, indexed by matrix_pos (row 0 is the top of the map).
+MapLayers = namedtuple('MapLayers', ['gold', 'pit', 'wumpus', 'breeze', 'stench', 'agent'])
+Issue = namedtuple('Issue', ['kind', 'matrix_pos'])
+
+# Issue kinds. Only the blocking ones make AgentBrain reject a map, as its original checks did.
+NO_AGENT = 'no_agent'
+MISSING_BREEZE = 'missing_breeze'       # At a cell next to a Pit.
+MISSING_STENCH = 'missing_stench'       # At a cell next to a Wumpus.
+MANY_AGENTS = 'many_agents'
+UNKNOWN_OBJECT = 'unknown_object'
+PIT_AND_WUMPUS = 'pit_and_wumpus'
+EXTRA_BREEZE = 'extra_breeze'           # At a cell with no Pit around.
+EXTRA_STENCH = 'extra_stench'           # At a cell with no Wumpus around.
+BLOCKING_KIND_LIST = [NO_AGENT, MISSING_BREEZE, MISSING_STENCH]
+
+# Cell text by object bits in file order G P W B S A, e.g. CELL_TEXT_LIST[0b001010] == 'PB'.
+OBJECT_ORDER = 'GPWBSA'
+CELL_TEXT_LIST = [''.join(obj for bit, obj in enumerate(OBJECT_ORDER) if code >> bit & 1) or '-'
+                  for code in range(1 << len(OBJECT_ORDER))]
+
+
+def get_adjacent_mask(mask):
+    # Cells with at least one of their 4 neighbours in mask: OR of the mask shifted one cell each way.
+    adjacent = np.zeros_like(mask)
+    adjacent[1:, :] |= mask[:-1, :]
+    adjacent[:-1, :] |= mask[1:, :]
+    adjacent[:, 1:] |= mask[:, :-1]
+    adjacent[:, :-1] |= mask[:, 1:]
+    return adjacent
+
+
+def parse_map(text):
+    # MapLayers of a map in the dotted format, and the mask of cells holding characters outside OBJECT_ORDER.
+    line_list = text.splitlines()
+    map_size = int(line_list[0])
+    row_list = [line.split('.') for line in line_list[1:map_size + 1]]
+    if len(row_list) != map_size or any(len(row) != map_size for row in row_list):
+        raise TypeError('Input Error: The map is not ' + str(map_size) + ' rows of ' + str(map_size) + ' cells.')
+    cell_array = np.array(row_list, dtype=np.str_)
+    layer_list = [np_strings.find(cell_array, obj) >= 0 for obj in 'GPWBSA']
+    unknown = np_strings.str_len(np_strings.strip(cell_array, OBJECT_ORDER + '-')) > 0
+    return MapLayers(*layer_list), unknown
+
+
+def read_map_file(map_filename):
+    with open(map_filename, 'r') as file:
+        return parse_map(file.read())
+
+
+def get_cell_layers(cell_matrix, agent_cell):
+    # MapLayers of the cells AgentBrain.read_map built, Cell.percept is [G, P, W, B, S].
+    percept_array = np.array([[cell.percept for cell in cell_row] for cell_row in cell_matrix], dtype=bool)
+    agent = np.zeros(percept_array.shape[:2], dtype=bool)
+    if agent_cell is not None:
+        agent[agent_cell.matrix_pos] = True
+    return MapLayers(*np.moveaxis(percept_array, 2, 0), agent)
+
+
+def get_position_list(mask):
+    return [(int(ir), int(ic)) for ir, ic in np.argwhere(mask)]
+
+
+def find_issues(layers, unknown=None):
+    # Every inconsistency of the map at once, grouped by kind and row major within a kind.
+    issue_list = []
+    agent_count = int(np.count_nonzero(layers.agent))
+    if agent_count == 0:
+        issue_list.append(Issue(NO_AGENT, None))
+    elif agent_count > 1:
+        issue_list.extend(Issue(MANY_AGENTS, pos) for pos in get_position_list(layers.agent))
+
+    near_pit = get_adjacent_mask(layers.pit)
+    near_wumpus = get_adjacent_mask(layers.wumpus)
+    for kind, mask in [(MISSING_BREEZE, near_pit & ~layers.breeze),
+                       (MISSING_STENCH, near_wumpus & ~layers.stench),
+                       (UNKNOWN_OBJECT, unknown),
+                       (PIT_AND_WUMPUS, layers.pit & layers.wumpus),
+                       (EXTRA_BREEZE, layers.breeze & ~near_pit),
+                       (EXTRA_STENCH, layers.stench & ~near_wumpus)]:
+        if mask is not None:
+            issue_list.extend(Issue(kind, pos) for pos in get_position_list(mask))
+    return issue_list
+
+
+def is_valid(layers):
+    # The contract of AgentBrain.is_valid_map: (False, matrix_pos of the first Pit or Wumpus with a neighbour
+    # missing its percept), else (False, None) without an agent, else (True, None).
+    bad_hazard = ((layers.pit & get_adjacent_mask(~layers.breeze)) |
+                  (layers.wumpus & get_adjacent_mask(~layers.stench)))
+    if bad_hazard.any():
+        return False, tuple(int(i) for i in np.unravel_index(np.argmax(bad_hazard), bad_hazard.shape))
+    if not layers.agent.any():
+        return False, None
+    return True, None
+
+
+def repair_layers(layers):
+    # Breeze and Stench derived from the hazards, which fixes every missing and extra percept.
+    return layers._replace(breeze=get_adjacent_mask(layers.pit), stench=get_adjacent_mask(layers.wumpus))
+
+
+def format_map(layers):
+    # The dotted format AgentBrain.read_map expects: the size, then one line per row of '.' separated cells.
+    code = np.zeros(layers.pit.shape, dtype=np.uint8)
+    for bit, layer in enumerate(layers):
+        code |= layer.astype(np.uint8) << bit
+    line_list = [str(len(code))]
+    for code_row in code.tolist():
+        line_list.append('.'.join([CELL_TEXT_LIST[cell_code] for cell_code in code_row]))
+    return '\n'.join(line_list) + '\n'
+
+
+def write_map_file(layers, map_filename):
+    with open(map_filename, 'w') as file:
+        file.write(format_map(layers))
+
+
+def validate_map_file(map_filename, repair=False):
+    # Issues found in the file. With repair the file is rewritten with derived percepts and without unknown
+    # objects, agent and Pit/Wumpus issues need a decision and are left to the author.
+    layers, unknown = read_map_file(map_filename)
+    issue_list = find_issues(layers, unknown)
+    if repair and any(issue.kind not in [NO_AGENT, MANY_AGENTS, PIT_AND_WUMPUS] for issue in issue_list):
+        write_map_file(repair_layers(layers), map_filename)
+    return issue_list
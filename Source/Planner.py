@@ -0,0 +1,181 @@
+import heapq
+from itertools import count
+
+# Headings as map_pos deltas, map_pos is (column, row) counted from the bottom left corner.
+UP = (0, 1)
+DOWN = (0, -1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+HEADING_LIST = [UP, DOWN, LEFT, RIGHT]
+
+# A move costs its score penalty, a turn is an action without penalty, so routes minimize moves first.
+MOVE_COST = 10
+TURN_COST = 1
+
+
+def get_heading(cell, next_cell):
+    return next_cell.map_pos[0] - cell.map_pos[0], next_cell.map_pos[1] - cell.map_pos[1]
+
+
+class PathPlanner:
+    # Shortest routes over the known safe cells. A search state is (cell, heading): stepping into a neighbour costs
+    # MOVE_COST plus TURN_COST if the agent does not face it yet. The graph only grows as cells are proven safe,
+    # so every cached distance map is dropped when a cell is added.
+    def __init__(self, cell_matrix):
+        self.cell_matrix = cell_matrix
+        self.safe_set = set()
+        self.version = 0
+        self.distance_map_dict = {}     # (cell, heading) -> DistanceMap
+        self.tie_breaker = count()
+        self.adj_dict = {}              # cell -> adjacent cells
+
+
+    def __contains__(self, cell):
+        return cell in self.safe_set
+
+
+    def add_safe_cell(self, cell):
+        if cell not in self.safe_set:
+            self.safe_set.add(cell)
+            self.version += 1
+
+
+    def get_adj_cell_list(self, cell):
+        adj_cell_list = self.adj_dict.get(cell)
+        if adj_cell_list is None:
+            adj_cell_list = self.adj_dict[cell] = cell.get_adj_cell_list(self.cell_matrix)
+        return adj_cell_list
+
+
+    def get_neighbour_list(self, cell):
+        return [adj_cell for adj_cell in self.get_adj_cell_list(cell) if adj_cell in self.safe_set]
+
+
+    @staticmethod
+    def get_step_cost(heading, cell, next_cell):
+        next_heading = get_heading(cell, next_cell)
+        if next_heading == heading:
+            return MOVE_COST, next_heading
+        return MOVE_COST + TURN_COST, next_heading
+
+
+    @staticmethod
+    def get_lower_bound(cell, heading, goal_cell):
+        # Admissible: every row and column still to cross is a move, and each axis not faced needs a turn.
+        dx = goal_cell.map_pos[0] - cell.map_pos[0]
+        dy = goal_cell.map_pos[1] - cell.map_pos[1]
+        cost = MOVE_COST * (abs(dx) + abs(dy))
+        if dx and (heading[0] * dx) <= 0:
+            cost += TURN_COST
+        if dy and (heading[1] * dy) <= 0:
+            cost += TURN_COST
+        return cost
+
+
+    @staticmethod
+    def get_path_cost(cell, heading, path):
+        cost = 0
+        for next_cell in path:
+            step_cost, heading = PathPlanner.get_step_cost(heading, cell, next_cell)
+            cost += step_cost
+            cell = next_cell
+        return cost
+
+
+    def find_path(self, start_cell, heading, goal_cell):
+        # A* from (start_cell, heading) to goal_cell through safe cells. goal_cell itself need not be safe yet,
+        # which is how the agent steps into a frontier cell. Returns the cells to move through, or None.
+        if start_cell is goal_cell:
+            return []
+        goal_adj_set = set(self.get_adj_cell_list(goal_cell))
+        start = (start_cell, heading)
+        cost_dict = {start: 0}
+        parent_dict = {start: None}
+        heap = [(self.get_lower_bound(start_cell, heading, goal_cell), next(self.tie_breaker), 0, start)]
+        while heap:
+            _, _, cost, state = heapq.heappop(heap)
+            if cost > cost_dict[state]:
+                continue
+            cell, heading = state
+            if cell is goal_cell:
+                path = []
+                while state is not None:
+                    path.append(state[0])
+                    state = parent_dict[state]
+                return path[-2::-1]
+
+            next_cell_list = self.get_neighbour_list(cell)
+            if cell in goal_adj_set:
+                next_cell_list.append(goal_cell)
+            for next_cell in next_cell_list:
+                step_cost, next_heading = self.get_step_cost(heading, cell, next_cell)
+                next_state = (next_cell, next_heading)
+                next_cost = cost + step_cost
+                if next_cost < cost_dict.get(next_state, next_cost + 1):
+                    cost_dict[next_state] = next_cost
+                    parent_dict[next_state] = state
+                    estimate = next_cost + self.get_lower_bound(next_cell, next_heading, goal_cell)
+                    heapq.heappush(heap, (estimate, next(self.tie_breaker), next_cost, next_state))
+        return None
+
+
+    def get_distance_map(self, start_cell, heading):
+        # Dijkstra from (start_cell, heading) to every safe cell and every unsafe neighbour of one, for callers
+        # routing to many goals from the same state. Cached until the safe graph grows.
+        key = (start_cell, heading)
+        distance_map = self.distance_map_dict.get(key)
+        if distance_map is not None and distance_map.version == self.version:
+            return distance_map
+
+        distance_map = DistanceMap(self.version)
+        start = (start_cell, heading)
+        cost_dict = {start: 0}
+        distance_map.parent_dict[start] = None
+        heap = [(0, next(self.tie_breaker), start)]
+        while heap:
+            cost, _, state = heapq.heappop(heap)
+            if cost > cost_dict[state]:
+                continue
+            cell, heading = state
+            if cell not in distance_map.cost_dict:
+                distance_map.cost_dict[cell] = cost
+                distance_map.state_dict[cell] = state
+            if cell is not start_cell and cell not in self.safe_set:
+                continue
+            for next_cell in self.get_adj_cell_list(cell):
+                step_cost, next_heading = self.get_step_cost(heading, cell, next_cell)
+                next_state = (next_cell, next_heading)
+                next_cost = cost + step_cost
+                if next_cost < cost_dict.get(next_state, next_cost + 1):
+                    cost_dict[next_state] = next_cost
+                    distance_map.parent_dict[next_state] = state
+                    heapq.heappush(heap, (next_cost, next(self.tie_breaker), next_state))
+
+        if len(self.distance_map_dict) > 64:
+            self.distance_map_dict = {}
+        self.distance_map_dict[key] = distance_map
+        return distance_map
+
+
+class DistanceMap:
+    # Cheapest routes from one (cell, heading) state, see PathPlanner.get_distance_map().
+    def __init__(self, version):
+        self.version = version
+        self.cost_dict = {}         # cell -> cheapest cost to stand on it
+        self.state_dict = {}        # cell -> (cell, heading) reached at that cost
+        self.parent_dict = {}       # (cell, heading) -> previous state on its cheapest route
+
+    def __contains__(self, cell):
+        return cell in self.cost_dict
+
+
+    def get_path(self, goal_cell):
+        # Same as PathPlanner.find_path(): the cells to move through, or None when goal_cell is out of reach.
+        state = self.state_dict.get(goal_cell)
+        if state is None:
+            return None
+        path = []
+        while state is not None:
+            path.append(state[0])
+            state = self.parent_dict[state]
+        return path[-2::-1]
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Prior probability that a cell holds a Pit / a Wumpus, the agent does not know the real densities of the map.
+PIT_DENSITY = 0.2
+WUMPUS_DENSITY = 0.1
+
+# Components with more unknown cells than this are not enumerated, their cells keep the prior.
+MAX_COMPONENT_SIZE = 20
+CHUNK_SIZE = 1 << 16    # Assignments checked per NumPy batch, bounds the memory of one enumeration.
+
+# Number of set bits per byte, for NumPy 1.x which has no np.bitwise_count.
+BYTE_BIT_COUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def bitwise_count(array):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(array)
+    return BYTE_BIT_COUNT[array.view(np.uint8)].reshape(array.shape + (array.itemsize,)).sum(axis=-1)
+
+
+def get_hazard_probabilities(constraint_list, prior):
+    # Exact posterior probability that each unknown cell holds the hazard, given independent priors and the
+    # percept constraints. constraint_list holds (key_list, perceived): perceived=True means at least one key
+    # holds the hazard, perceived=False means none does. Keys in no constraint are left out of the result.
+    free_set = set()
+    for key_list, perceived in constraint_list:
+        if not perceived:
+            free_set.update(key_list)
+    probability_dict = {key: 0.0 for key in free_set}
+
+    clause_list = []
+    for key_list, perceived in constraint_list:
+        if perceived:
+            clause = [key for key in key_list if key not in free_set]
+            if clause:      # An empty clause means the percepts are inconsistent, nothing to learn from it.
+                clause_list.append(clause)
+
+    for key_list, component_clause_list in split_components(clause_list):
+        index_dict = {key: i for i, key in enumerate(key_list)}
+        mask_list = []
+        for clause in component_clause_list:
+            mask = 0
+            for key in clause:
+                mask |= 1 << index_dict[key]
+            mask_list.append(mask)
+        marginal = enumerate_component(len(key_list), mask_list, prior)
+        for key, probability in zip(key_list, marginal):
+            probability_dict[key] = float(probability)
+    return probability_dict
+
+
+def split_components(clause_list):
+    # Cells only interact through the clauses they share, so each connected part is enumerated on its own:
+    # 2^a + 2^b assignments instead of 2^(a + b).
+    parent_dict = {}
+
+    def find(key):
+        while parent_dict[key] != key:
+            parent_dict[key] = parent_dict[parent_dict[key]]
+            key = parent_dict[key]
+        return key
+
+    for clause in clause_list:
+        for key in clause:
+            parent_dict.setdefault(key, key)
+        root = find(clause[0])
+        for key in clause[1:]:
+            parent_dict[find(key)] = root
+
+    component_dict = {}     # root -> [key_list, clause_list]
+    for key in parent_dict:
+        component_dict.setdefault(find(key), [[], []])[0].append(key)
+    for clause in clause_list:
+        component_dict[find(clause[0])][1].append(clause)
+    return list(component_dict.values())
+
+
+def enumerate_component(key_count, mask_list, prior):
+    # Every assignment of the component is a row of bits, the clauses are bit masks: an assignment is consistent
+    # iff it shares a bit with every mask. Rows are weighted by the prior and summed per column.
+    if key_count > MAX_COMPONENT_SIZE:
+        return np.full(key_count, prior)
+
+    mask_array = np.array(mask_list, dtype=np.uint64)
+    bit_array = np.left_shift(np.uint64(1), np.arange(key_count, dtype=np.uint64))
+    hazard_count = np.arange(key_count + 1)
+    weight_table = prior ** hazard_count * (1.0 - prior) ** (key_count - hazard_count)
+
+    total = 0.0
+    marginal = np.zeros(key_count)
+    for start in range(0, 1 << key_count, CHUNK_SIZE):
+        assignment = np.arange(start, min(start + CHUNK_SIZE, 1 << key_count), dtype=np.uint64)
+        consistent = np.all((assignment[:, None] & mask_array[None, :]) != 0, axis=1)
+        assignment = assignment[consistent]
+        weight = weight_table[bitwise_count(assignment)]
+        total += weight.sum()
+        marginal += ((assignment[:, None] & bit_array[None, :]) != 0).T @ weight
+
+    if total == 0.0:
+        return np.full(key_count, prior)
+    return marginal / total
+
+
+def combine_hazards(pit_probability, wumpus_probability):
+    # Pits and Wumpuses are enumerated separately, the cell is deadly if it holds either.
+    return 1.0 - (1.0 - pit_probability) * (1.0 - wumpus_probability)
@@ -0,0 +1,108 @@
+class UnitPropagator:
+    # Unit propagation with two watched literals. The root trail holds every literal implied by the clauses;
+    # probe() extends it with a temporary assumption and undoes it afterwards. Clauses satisfied at the root are
+    # dropped since root assignments are never undone (deleting clauses rebuilds the propagator of
+    # their component).
+    def __init__(self):
+        self.value_dict = {}        # var -> the literal of var that is true
+        self.trail = []
+        self.queue_head = 0
+        self.watch_dict = {}        # literal -> [clause, ...] watching literal, clause[0] and clause[1] are watched
+        self.inconsistent = False
+
+
+    def is_true(self, literal):
+        return self.value_dict.get(abs(literal)) == literal
+
+    def is_false(self, literal):
+        return self.value_dict.get(abs(literal)) == -literal
+
+
+    def assign(self, literal):
+        self.value_dict[abs(literal)] = literal
+        self.trail.append(literal)
+
+
+    def add_clause(self, clause):
+        if self.inconsistent:
+            return
+        free_list = []
+        for literal in clause:
+            if self.is_true(literal):
+                return
+            if not self.is_false(literal):
+                free_list.append(literal)
+
+        if not free_list:
+            self.inconsistent = True
+        elif len(free_list) == 1:
+            self.assign(free_list[0])
+            if not self.propagate():
+                self.inconsistent = True
+        else:
+            # Watch two free literals, the false ones are never looked at again.
+            watched = free_list + [literal for literal in clause if self.is_false(literal)]
+            self.watch_dict.setdefault(watched[0], []).append(watched)
+            self.watch_dict.setdefault(watched[1], []).append(watched)
+
+
+    def propagate(self):
+        while self.queue_head < len(self.trail):
+            false_literal = -self.trail[self.queue_head]
+            self.queue_head += 1
+            watch_list = self.watch_dict.get(false_literal)
+            if not watch_list:
+                continue
+
+            kept_list = []
+            for index, clause in enumerate(watch_list):
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                other = clause[0]
+                if self.is_true(other):
+                    kept_list.append(clause)
+                    continue
+
+                # Look for a new literal to watch.
+                for k in range(2, len(clause)):
+                    if not self.is_false(clause[k]):
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watch_dict.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept_list.append(clause)
+                    if self.is_false(other):
+                        kept_list.extend(watch_list[index + 1:])
+                        self.watch_dict[false_literal] = kept_list
+                        return False
+                    self.assign(other)
+            self.watch_dict[false_literal] = kept_list
+        return True
+
+
+    def probe(self, literal):
+        # Returns True when the clauses together with literal propagate to a conflict.
+        if self.inconsistent or self.is_false(literal):
+            return True
+        if self.is_true(literal):
+            return False
+
+        root_size = len(self.trail)
+        self.assign(literal)
+        conflict = not self.propagate()
+        for assigned in self.trail[root_size:]:
+            del self.value_dict[abs(assigned)]
+        del self.trail[root_size:]
+        self.queue_head = root_size
+        return conflict
+
+
+    def entails(self, literal):
+        # True or False when propagation decides KB |= literal, None otherwise.
+        if self.inconsistent or self.is_true(literal):
+            return True
+        if self.is_false(literal):
+            return False
+        if self.probe(-literal):
+            return True
+        return None
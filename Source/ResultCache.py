@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+
+import Algorithms
+import Cell
+
+# Specification imports pygame, the solver side of the project resolves its own paths.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, 'Assets', 'Cache')
+MAX_CACHE_BYTES = 16 << 20
+FORMAT_VERSION = 1      # Layout of an entry file, see ResultCache.store().
+ENTRY_SUFFIX = '.bin'
+
+
+class ResultCache:
+    # Solve results on disk, addressed by a hash of the map file contents, AgentBrain.VERSION and the agent
+    # options, so an edited map or a changed agent never hits a stale entry. An entry holds the initial cells and
+    # the actions, one byte per Action value, which is all a frontend needs to replay the run without a KB.
+    # Loading an entry touches it and the least recently used entries are evicted past max_bytes.
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hit_count = 0
+        self.miss_count = 0
+
+
+    @staticmethod
+    def get_key(map_filename, agent_kwargs=None):
+        digest = hashlib.sha256()
+        with open(map_filename, 'rb') as file:
+            digest.update(file.read())
+        option = {'format': FORMAT_VERSION, 'agent': Algorithms.AgentBrain.VERSION}
+        option.update(agent_kwargs or {})
+        digest.update(json.dumps(option, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+
+    def get_entry_filename(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+
+    def load(self, key):
+        # Returns (action_list, init_agent_cell, init_cell_matrix) like AgentBrain.solve_wumpus_world(), or None.
+        entry_filename = self.get_entry_filename(key)
+        try:
+            with open(entry_filename, 'rb') as file:
+                header = json.loads(file.readline())
+                action_bytes = file.read()
+            os.utime(entry_filename)
+        except (OSError, ValueError):
+            self.miss_count += 1
+            return None
+        if header.get('format') != FORMAT_VERSION:
+            self.miss_count += 1
+            return None
+
+        self.hit_count += 1
+        map_size = header['map_size']
+        cell_matrix = [[Cell.Cell((ir, ic), map_size, header['cells'][ir * map_size + ic])
+                        for ic in range(map_size)] for ir in range(map_size)]
+        agent_cell = cell_matrix[header['agent'][0]][header['agent'][1]]
+        return [Algorithms.Action(value) for value in action_bytes], agent_cell, cell_matrix
+
+
+    def store(self, key, action_list, init_agent_cell, init_cell_matrix):
+        # One JSON header line with the initial cells, then the raw action bytes. Written to a temporary file and
+        # renamed, so concurrent solvers and readers never see half an entry.
+        header = {'format': FORMAT_VERSION,
+                  'map_size': len(init_cell_matrix),
+                  'agent': list(init_agent_cell.matrix_pos),
+                  'cells': [get_objects_str(cell, cell.matrix_pos == init_agent_cell.matrix_pos)
+                            for cell_row in init_cell_matrix for cell in cell_row]}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_filename = self.get_entry_filename(key)
+        temp_filename = entry_filename + '.' + str(os.getpid())
+        with open(temp_filename, 'wb') as file:
+            file.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+            file.write(bytes(action.value for action in action_list))
+        os.replace(temp_filename, entry_filename)
+        self.evict()
+
+
+    def evict(self):
+        entry_list = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entry_list.append((stat.st_mtime, stat.st_size, name))
+                total_size += stat.st_size
+
+        entry_list.sort()
+        for _, size, name in entry_list:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            total_size -= size
+
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(ENTRY_SUFFIX):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+def get_objects_str(cell, is_agent=False):
+    # Inverse of Cell.init() for the map file format.
+    objects_str = ''.join(obj.value for obj, exist in zip([Cell.Object.GOLD, Cell.Object.PIT, Cell.Object.WUMPUS,
+                                                            Cell.Object.BREEZE, Cell.Object.STENCH], cell.percept)
+                          if exist)
+    if is_agent:
+        objects_str += Cell.Object.AGENT.value
+    return objects_str or Cell.Object.EMPTY.value
@@ -0,0 +1,76 @@
+import json
+import os
+
+from pysat.solvers import Solver
+
+# Specification imports pygame, the solver side of the project resolves its own paths.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TUNING_FILE = os.path.join(BASE_DIR, 'Assets', 'solver_tuning.json')
+
+DEFAULT_BACKEND = 'glucose3'
+AUTO = 'auto'
+
+# Upper bounds of the map size buckets used by the autotuner, the last bucket is open ended.
+SIZE_BUCKET_LIST = [10, 25, 50, 100, 250]
+
+BACKEND_DICT = {}       # name -> factory returning a fresh pysat-like solver
+
+
+def register_backend(name, factory):
+    BACKEND_DICT[name] = factory
+
+
+# Lingeling is left out: it eliminates variables while solving and aborts the process when a later clause mentions
+# one, and the KB sessions add clauses between queries.
+for _name in ['cadical153', 'cadical195', 'glucose3', 'glucose4', 'glucose42', 'maplechrono', 'maplecm', 'maplesat',
+              'mergesat3', 'minicard', 'minisat22']:
+    register_backend(_name, lambda name=_name: Solver(name=name))
+
+
+def get_backend(name):
+    if name not in BACKEND_DICT:
+        raise TypeError('Error: Unknown solver backend ' + str(name) + '. Available: ' + ', '.join(BACKEND_DICT) + '.')
+    return BACKEND_DICT[name]
+
+
+def get_available_backend_list():
+    # The installed python-sat may be built without some of the solvers.
+    available_list = []
+    for name, factory in BACKEND_DICT.items():
+        try:
+            solver = factory()
+        except Exception:
+            continue
+        solver.delete()
+        available_list.append(name)
+    return available_list
+
+
+def get_size_bucket(map_size):
+    for bound in SIZE_BUCKET_LIST:
+        if map_size <= bound:
+            return str(bound)
+    return 'inf'
+
+
+def load_tuning(tuning_filename=TUNING_FILE):
+    if not os.path.exists(tuning_filename):
+        return {}
+    with open(tuning_filename, 'r') as file:
+        return json.load(file)
+
+
+def save_tuning(tuning, tuning_filename=TUNING_FILE):
+    with open(tuning_filename, 'w') as file:
+        json.dump(tuning, file, indent=2, sort_keys=True)
+
+
+def resolve_backend(name, map_size, tuning_filename=TUNING_FILE):
+    # 'auto' picks the fastest backend the autotuner recorded for the size bucket of the map.
+    if name != AUTO:
+        get_backend(name)
+        return name
+    choice = load_tuning(tuning_filename).get('buckets', {}).get(get_size_bucket(map_size))
+    if choice in BACKEND_DICT:
+        return choice
+    return DEFAULT_BACKEND
@@ -0,0 +1,311 @@
+import multiprocessing
+import os
+import queue
+import time
+
+import Algorithms
+import ResultCache
+
+# Message kinds sent by the worker process.
+INIT = 'init'           # (INIT, (init_agent_cell, init_cell_matrix))
+ACTIONS = 'actions'     # (ACTIONS, [Action.value, ...])
+DONE = 'done'           # (DONE, None)
+ERROR = 'error'         # (ERROR, text)
+
+BATCH_SIZE = 64         # Actions per message at most,
+BATCH_TIME = 0.02       # and seconds before a partial batch is sent anyway.
+
+PRESOLVE_WORKERS = max(1, (os.cpu_count() or 2) - 1)     # Leaves a core to the pygame loop.
+
+
+def solve(map_filename, output_filename, message_queue, cancel_event, agent_kwargs, result_cache=None,
+          cache_key=None):
+    # Entry point of the worker process: streams the actions of AgentBrain.iter_actions() in batches, and stores
+    # the finished run in result_cache under cache_key.
+    try:
+        agent_brain = Algorithms.AgentBrain(map_filename, output_filename, **agent_kwargs)
+        message_queue.put((INIT, (agent_brain.init_agent_cell, agent_brain.init_cell_matrix)))
+        action_list = []
+        batch = []
+        batch_start = time.perf_counter()
+        for event in agent_brain.iter_actions():
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            if result_cache is not None:
+                action_list.append(event.action)
+            batch.append(event.action.value)
+            if len(batch) >= BATCH_SIZE or time.perf_counter() - batch_start >= BATCH_TIME:
+                message_queue.put((ACTIONS, batch))
+                batch = []
+                batch_start = time.perf_counter()
+        if batch:
+            message_queue.put((ACTIONS, batch))
+        if result_cache is not None:
+            result_cache.store(cache_key, action_list, agent_brain.init_agent_cell, agent_brain.init_cell_matrix)
+        message_queue.put((DONE, None))
+    except Exception as e:
+        message_queue.put((ERROR, str(e)))
+
+
+def presolve(map_filename, output_filename, message_queue, claim_lock, claim_dict, run_id, agent_kwargs,
+             result_cache=None, cache_key=None):
+    # Task of the PresolvePool, streams like solve(). A run still queued when its map is asked for is handed to a
+    # process of its own (see PresolveRun.take_over()), the pool then skips it.
+    with claim_lock:
+        if run_id in claim_dict:
+            return
+        claim_dict[run_id] = os.getpid()
+    if result_cache is not None:
+        result = result_cache.load(cache_key)
+        if result is not None:
+            action_list, init_agent_cell, init_cell_matrix = result
+            message_queue.put((INIT, (init_agent_cell, init_cell_matrix)))
+            message_queue.put((ACTIONS, [action.value for action in action_list]))
+            message_queue.put((DONE, None))
+            return
+    solve(map_filename, output_filename, message_queue, None, agent_kwargs, result_cache, cache_key)
+
+
+class PresolveRun:
+    # One map solved ahead by the PresolvePool. The messages of the run are kept here, so every SolverProcess
+    # asking for the map replays the actions received so far and then follows the solve as it goes.
+    def __init__(self, presolve_pool, run_id, map_filename, output_filename, agent_kwargs, cache_key):
+        self.presolve_pool = presolve_pool
+        self.run_id = run_id
+        self.map_filename = map_filename
+        self.output_filename = output_filename
+        self.agent_kwargs = agent_kwargs
+        self.cache_key = cache_key
+        self.message_queue = presolve_pool.manager.Queue()
+        self.async_result = presolve_pool.pool.apply_async(
+            presolve, (map_filename, output_filename, self.message_queue, presolve_pool.claim_lock,
+                       presolve_pool.claim_dict, run_id, agent_kwargs, presolve_pool.result_cache, cache_key))
+        self.process = None
+        self.init_state = None
+        self.action_list = []       # Action values
+        self.done = False
+        self.error = None
+
+
+    def take_over(self):
+        # Solves the run in a process of its own unless a pool worker has already started it, so a map asked for
+        # while the pool is busy with others is not left waiting behind them. Returns whether it took the run.
+        with self.presolve_pool.claim_lock:
+            if self.run_id in self.presolve_pool.claim_dict:
+                return False
+            self.presolve_pool.claim_dict[self.run_id] = None
+        # spawn: a forked child would inherit the pygame display of the parent.
+        context = multiprocessing.get_context('spawn')
+        self.message_queue = context.Queue()
+        self.process = context.Process(target=solve, args=(self.map_filename, self.output_filename,
+                                                             self.message_queue, None, self.agent_kwargs,
+                                                             self.presolve_pool.result_cache, self.cache_key),
+                                       daemon=True)
+        self.process.start()
+        return True
+
+
+    def receive(self, timeout=0.0):
+        # Moves every waiting message into the buffers of the run, blocks at most timeout seconds for the first one.
+        while not self.done:
+            try:
+                kind, payload = self.message_queue.get(timeout=timeout) if timeout else self.message_queue.get_nowait()
+            except queue.Empty:
+                if self.process is not None:
+                    finished = not self.process.is_alive()
+                else:
+                    finished = self.async_result.ready()
+                if finished and self.message_queue.empty():
+                    # DONE and ERROR end the loop, the solver died before sending either.
+                    self.done = True
+                    self.error = 'Solver stopped without a result.'
+                return
+            timeout = 0.0
+            if kind == INIT:
+                self.init_state = payload
+            elif kind == ACTIONS:
+                self.action_list.extend(payload)
+            elif kind == DONE:
+                self.done = True
+            else:
+                self.error = payload
+                self.done = True
+
+
+    def close(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+class PresolvePool:
+    # Solves maps speculatively in a process pool before they are asked for. Runs stay in memory keyed like the
+    # ResultCache, by map content and agent options, so asking for a map again, or while it is still being solved,
+    # follows the same run instead of solving twice, and an edited map is solved afresh.
+    def __init__(self, result_cache=None, worker_count=PRESOLVE_WORKERS):
+        self.result_cache = result_cache
+        self.worker_count = worker_count
+        self.pool = None
+        self.manager = None         # Serves the message queues of the runs to the pool workers.
+        self.claim_lock = None
+        self.claim_dict = None      # run id -> pid of the pool worker solving it, None once taken over
+        self.run_count = 0
+        self.run_dict = {}          # key -> PresolveRun
+
+
+    def submit(self, map_filename, output_filename, **agent_kwargs):
+        key = ResultCache.ResultCache.get_key(map_filename, agent_kwargs)
+        run = self.run_dict.get(key)
+        if run is not None:
+            run.receive()
+            if run.error is None:
+                return run
+            run.close()
+
+        if self.pool is None:
+            # spawn: a forked child would inherit the pygame display of the parent.
+            context = multiprocessing.get_context('spawn')
+            self.pool = context.Pool(self.worker_count)
+            self.manager = context.Manager()
+            self.claim_lock = self.manager.Lock()
+            self.claim_dict = self.manager.dict()
+        self.run_count += 1
+        run = PresolveRun(self, self.run_count, map_filename, output_filename, agent_kwargs, key)
+        self.run_dict[key] = run
+        return run
+
+
+    def close(self):
+        for run in self.run_dict.values():
+            run.close()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.manager.shutdown()
+            self.pool = None
+            self.manager = None
+        self.run_dict = {}
+
+
+class SolverProcess:
+    # Runs one solve in a separate process so the pygame loop keeps pumping events. The frontend polls for the
+    # initial map state and then for actions as they arrive, and can cancel at any time. With a ResultCache a
+    # run solved before is replayed from disk and no process is started at all. With a PresolvePool the run of
+    # the pool is followed from its first action, whether it is finished, in flight, or still queued.
+    def __init__(self, map_filename, output_filename, result_cache=None, presolve_pool=None, **agent_kwargs):
+        self.map_filename = map_filename
+        self.output_filename = output_filename
+        self.result_cache = result_cache
+        self.presolve_pool = presolve_pool
+        self.agent_kwargs = agent_kwargs
+        self.presolve_run = None
+        self.process = None
+        self.message_queue = None
+        self.cancel_event = None
+        self.init_state = None
+        self.pending_action_list = []
+        self.next_index = 0
+        self.done = False
+        self.error = None
+        self.cached = False
+
+
+    def start(self):
+        if self.presolve_pool is not None:
+            self.presolve_run = self.presolve_pool.submit(self.map_filename, self.output_filename, **self.agent_kwargs)
+            self.presolve_run.receive()
+            if self.presolve_run.init_state is None and not self.presolve_run.done:
+                self.presolve_run.take_over()
+            self.receive()
+            return self
+
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.get_key(self.map_filename, self.agent_kwargs)
+            result = self.result_cache.load(cache_key)
+            if result is not None:
+                action_list, init_agent_cell, init_cell_matrix = result
+                self.init_state = (init_agent_cell, init_cell_matrix)
+                self.pending_action_list = [action.value for action in action_list]
+                self.done = True
+                self.cached = True
+                return self
+
+        # spawn: a forked child would inherit the pygame display of the parent.
+        context = multiprocessing.get_context('spawn')
+        self.message_queue = context.Queue()
+        self.cancel_event = context.Event()
+        self.process = context.Process(target=solve, args=(self.map_filename, self.output_filename,
+                                                             self.message_queue, self.cancel_event, self.agent_kwargs,
+                                                             self.result_cache, cache_key), daemon=True)
+        self.process.start()
+        return self
+
+
+    def receive(self, timeout=0.0):
+        # Moves every waiting message into the local buffers, blocks at most timeout seconds for the first one.
+        if self.presolve_run is not None:
+            # The run keeps every action, pending_action_list is its list and only grows.
+            if not self.done:
+                self.presolve_run.receive(timeout)
+                self.init_state = self.presolve_run.init_state
+                self.pending_action_list = self.presolve_run.action_list
+                self.done = self.presolve_run.done
+                self.error = self.presolve_run.error
+            return
+
+        while not self.done:
+            try:
+                kind, payload = self.message_queue.get(timeout=timeout) if timeout else self.message_queue.get_nowait()
+            except queue.Empty:
+                if not self.process.is_alive() and self.message_queue.empty():
+                    self.done = True
+                    if self.error is None and self.process.exitcode:
+                        self.error = 'Solver process exited with code ' + str(self.process.exitcode) + '.'
+                return
+            timeout = 0.0
+            if kind == INIT:
+                self.init_state = payload
+            elif kind == ACTIONS:
+                self.pending_action_list.extend(payload)
+            elif kind == DONE:
+                self.done = True
+            else:
+                self.error = payload
+                self.done = True
+
+
+    def get_init_state(self, timeout=0.0):
+        # (init_agent_cell, init_cell_matrix) once the worker has read the map, None before that.
+        if self.init_state is None:
+            self.receive(timeout)
+        return self.init_state
+
+
+    def next_action(self, timeout=0.0):
+        # The next Action, or None if none has arrived yet (or the solve is over, see is_finished()).
+        if self.next_index == len(self.pending_action_list):
+            if self.presolve_run is None:
+                self.pending_action_list = []
+                self.next_index = 0
+            self.receive(timeout)
+            if self.next_index == len(self.pending_action_list):
+                return None
+        action = Algorithms.Action(self.pending_action_list[self.next_index])
+        self.next_index += 1
+        return action
+
+
+    def is_finished(self):
+        return self.done and self.next_index == len(self.pending_action_list)
+
+
+    def cancel(self):
+        # Only stops waiting on a pooled run, the pool finishes it for the next request of the map.
+        self.done = True
+        if self.process is None:
+            return
+        self.cancel_event.set()
+        self.process.join(0.5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
@@ -0,0 +1,265 @@
+from array import array
+from collections import namedtuple
+import bz2
+import gzip
+import json
+import lzma
+import struct
+
+try:
+    from compression import zstd    # Python 3.14+
+except ImportError:
+    zstd = None
+
+# Verbosity levels, a sink drops every event above its level before encoding anything.
+OFF = 0
+ACTIONS = 1     # Actions with their score changes.
+STEPS = 2       # Moves, inferences, shots tried, cells proven safe, risks taken, loops.
+KB = 3          # KB dumps, the default: the level of the original result files.
+QUERIES = 4     # Every entailment query with its answer.
+
+# Event kinds, the values are the record tags of the binary encoding.
+ACTION = 1      # value: (Action, score_delta)
+MOVE = 2
+INFER = 3
+TRY = 4
+SAFE = 5
+RISK = 6        # value: hazard probability
+LOOP = 7        # value: step of the earlier visit
+KB_DUMP = 8     # value: clause list, after the percepts of a cell
+KB_UPDATE = 9   # value: clause list, after a Wumpus is killed
+QUERY = 10      # value: (goal literal list, result)
+KB_DELTA = 11   # value: (added clause list, removed clause list), since the previous KB event
+
+KIND_NAME_LIST = [None, 'action', 'move', 'infer', 'try', 'safe', 'risk', 'loop', 'kb', 'kb_update', 'query',
+                  'kb_delta']
+KIND_LEVEL_LIST = [OFF, ACTIONS, STEPS, STEPS, STEPS, STEPS, STEPS, STEPS, KB, KB, QUERIES, KB]
+
+TraceEvent = namedtuple('TraceEvent', ['kind', 'map_pos', 'value'])
+
+BUFFER_SIZE = 1 << 16
+# A KB event is the full clause list once the deltas written since the last one add up to CHECKPOINT_RATIO times
+# the size of the KB, the others only the change since the previous event. Every checkpoint is then paid for by as
+# many delta bytes, so the trace grows linearly with the changes instead of with the KB size per event. 0 logs
+# the full KB every time, as the original result files did.
+CHECKPOINT_RATIO = 1.0
+BINARY_MAGIC = b'WWT1'
+
+COMPRESSION_DICT = {'gzip': gzip.open, 'bz2': bz2.open, 'lzma': lzma.open}
+if zstd is not None:
+    COMPRESSION_DICT['zstd'] = zstd.open
+
+
+class TextEncoder:
+    # The line format of the original result files.
+    def __init__(self):
+        self.var_table = None
+        self.score = 0
+
+
+    def begin(self, var_table):
+        self.var_table = var_table
+        self.score = 0
+        return b''
+
+
+    def encode(self, event):
+        kind = event.kind
+        if kind == ACTION:
+            action, score_delta = event.value
+            if not score_delta:
+                return (action.name + '\n').encode()
+            self.score += score_delta
+            return (action.name + '\nScore: ' + str(self.score) + '\n').encode()
+        if kind == MOVE:
+            text = 'Move to: ' + str(event.map_pos)
+        elif kind == INFER:
+            text = 'Infer: ' + str(event.map_pos)
+        elif kind == TRY:
+            text = 'Try: ' + str(event.map_pos)
+        elif kind == SAFE:
+            text = 'Safe: ' + str(event.map_pos)
+        elif kind == RISK:
+            text = 'Risk: ' + str(event.map_pos) + ' ' + str(round(event.value, 3))
+        elif kind == LOOP:
+            text = 'Loop: ' + str(event.map_pos) + ' repeats the state of step ' + str(event.value)
+        elif kind == KB_DUMP:
+            text = self.var_table.format_clause_list(event.value)
+        elif kind == KB_UPDATE:
+            text = 'KB: ' + self.var_table.format_clause_list(event.value)
+        elif kind == KB_DELTA:
+            text = ('KB+: ' + self.var_table.format_clause_list(event.value[0]) +
+                    '\nKB-: ' + self.var_table.format_clause_list(event.value[1]))
+        elif kind == QUERY:
+            goal_list, result = event.value
+            text = 'Query: ' + self.var_table.format_clause_list([goal_list]) + ' ' + str(result)
+        else:
+            raise TypeError('Error: Unknown trace event kind ' + str(kind) + '.')
+        return (text + '\n').encode()
+
+
+class JsonEncoder:
+    # One JSON object per line, literals stay DIMACS integers.
+    def begin(self, var_table):
+        return b''
+
+
+    def encode(self, event):
+        kind = event.kind
+        record = {'kind': KIND_NAME_LIST[kind]}
+        if event.map_pos is not None:
+            record['pos'] = event.map_pos
+        if kind == ACTION:
+            record['action'] = event.value[0].name
+            record['delta'] = event.value[1]
+        elif kind == RISK:
+            record['p'] = event.value
+        elif kind == LOOP:
+            record['step'] = event.value
+        elif kind == KB_DUMP or kind == KB_UPDATE:
+            record['clauses'] = [list(clause) for clause in event.value]
+        elif kind == KB_DELTA:
+            record['added'] = [list(clause) for clause in event.value[0]]
+            record['removed'] = [list(clause) for clause in event.value[1]]
+        elif kind == QUERY:
+            record['goal'] = event.value[0]
+            record['result'] = event.value[1]
+        return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+
+class BinaryEncoder:
+    # Little endian records behind BINARY_MAGIC: a kind byte, the map_pos as two int16 when the kind has one, then
+    # ACTION: uint8 action value, int32 score_delta | RISK: float32 | LOOP: uint32 |
+    # KB_DUMP, KB_UPDATE: a clause list, uint32 count then per clause uint16 length and int32 literals |
+    # KB_DELTA: the added then the removed clause list | QUERY: uint8 result, uint16 length and int32 literals.
+    def begin(self, var_table):
+        return BINARY_MAGIC
+
+
+    def encode(self, event):
+        kind = event.kind
+        if kind == ACTION:
+            action, score_delta = event.value
+            return struct.pack('<BhhBi', kind, event.map_pos[0], event.map_pos[1], action.value, score_delta)
+        if kind == RISK:
+            return struct.pack('<Bhhf', kind, event.map_pos[0], event.map_pos[1], event.value)
+        if kind == LOOP:
+            return struct.pack('<BhhI', kind, event.map_pos[0], event.map_pos[1], event.value)
+        if kind == KB_DUMP or kind == KB_UPDATE:
+            return struct.pack('<Bhh', kind, event.map_pos[0], event.map_pos[1]) + encode_clause_list(event.value)
+        if kind == KB_DELTA:
+            return (struct.pack('<Bhh', kind, event.map_pos[0], event.map_pos[1]) +
+                    encode_clause_list(event.value[0]) + encode_clause_list(event.value[1]))
+        if kind == QUERY:
+            return struct.pack('<B?', kind, event.value[1]) + encode_literals(event.value[0])
+        return struct.pack('<Bhh', kind, event.map_pos[0], event.map_pos[1])
+
+
+def encode_literals(literal_list):
+    return struct.pack('<H', len(literal_list)) + array('i', literal_list).tobytes()
+
+
+def encode_clause_list(clause_list):
+    return struct.pack('<I', len(clause_list)) + b''.join(encode_literals(clause) for clause in clause_list)
+
+
+ENCODER_DICT = {'text': TextEncoder, 'jsonl': JsonEncoder, 'binary': BinaryEncoder}
+
+
+class TraceSink:
+    # Buffered trace of one run: events are encoded at once (the KB may change right after) and the bytes are
+    # gathered in memory and written BUFFER_SIZE at a time to a file opened once per run. Events above the level
+    # are dropped before any encoding. compression is a COMPRESSION_DICT name or None.
+    def __init__(self, filename, encoder='text', level=KB, compression=None, buffer_size=BUFFER_SIZE,
+                 checkpoint_ratio=CHECKPOINT_RATIO):
+        if encoder not in ENCODER_DICT:
+            raise TypeError('Error: Unknown trace encoder ' + str(encoder) + '. Available: ' +
+                            ', '.join(ENCODER_DICT) + '.')
+        if compression is not None and compression not in COMPRESSION_DICT:
+            raise TypeError('Error: Unknown or unavailable trace compression ' + str(compression) + '.')
+        self.filename = filename
+        self.encoder = ENCODER_DICT[encoder]()
+        self.level = level
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.checkpoint_ratio = checkpoint_ratio
+        self.checkpoint_size = 0            # Bytes of the last checkpoint.
+        self.checkpoint_clause_count = 0    # Clauses in the last checkpoint.
+        self.delta_size = 0                 # Bytes of the deltas since the last checkpoint.
+        self.active_level = OFF     # The level while open, OFF otherwise.
+        self.file = None
+        self.chunk_list = []
+        self.chunk_size = 0
+        self.event_count = 0
+        self.byte_count = 0
+
+
+    def open(self, var_table):
+        self.close()
+        if self.compression is None:
+            self.file = open(self.filename, 'wb')
+        else:
+            self.file = COMPRESSION_DICT[self.compression](self.filename, 'wb')
+        self.active_level = self.level
+        self.event_count = 0
+        self.byte_count = 0
+        self.checkpoint_size = 0
+        self.checkpoint_clause_count = 0
+        self.delta_size = 0
+        self.write(self.encoder.begin(var_table))
+
+
+    def is_enabled(self, level):
+        return level <= self.active_level
+
+
+    def emit(self, kind, map_pos=None, value=None):
+        if KIND_LEVEL_LIST[kind] > self.active_level:
+            return
+        self.event_count += 1
+        self.write(self.encoder.encode(TraceEvent(kind, map_pos, value)))
+
+
+    def emit_kb(self, kind, map_pos, clause_store):
+        # KB_DUMP or KB_UPDATE of the whole clause_store at checkpoints, a KB_DELTA of its journal in between.
+        # The size of the KB is estimated from the bytes per clause of the last checkpoint.
+        if KIND_LEVEL_LIST[kind] > self.active_level:
+            return
+        journal = clause_store.journal
+        clause_store.journal = {}
+        start = self.byte_count + self.chunk_size
+        kb_size = self.checkpoint_size * len(clause_store) / max(self.checkpoint_clause_count, 1)
+        if journal is None or self.delta_size >= self.checkpoint_ratio * kb_size:
+            self.emit(kind, map_pos, clause_store)
+            self.checkpoint_size = self.byte_count + self.chunk_size - start
+            self.checkpoint_clause_count = len(clause_store)
+            self.delta_size = 0
+        else:
+            added_list = [clause for clause, change in journal.items() if change >= 0]
+            removed_list = [clause for clause, change in journal.items() if change <= 0]
+            self.emit(KB_DELTA, map_pos, (added_list, removed_list))
+            self.delta_size += self.byte_count + self.chunk_size - start
+
+
+    def write(self, data):
+        self.chunk_list.append(data)
+        self.chunk_size += len(data)
+        if self.chunk_size >= self.buffer_size:
+            self.flush()
+
+
+    def flush(self):
+        if self.file is not None and self.chunk_list:
+            data = b''.join(self.chunk_list)
+            self.file.write(data)
+            self.byte_count += len(data)
+        self.chunk_list = []
+        self.chunk_size = 0
+
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+        self.active_level = OFF
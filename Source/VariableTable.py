@@ -0,0 +1,80 @@
+from array import array
+
+from Cell import Object
+
+
+class VariableTable:
+    # Dense DIMACS variables for the (cell, predicate) pairs of one map. The variables of a cell are contiguous:
+    # var = 4 * (index_pos - 1) + predicate_index + 1, so 1 .. 4 * map_size^2 are used and nothing else.
+    # The table is immutable and shared by every Cell of the map, copies of a cell matrix share it too.
+    PREDICATE_LIST = [Object.PIT, Object.WUMPUS, Object.BREEZE, Object.STENCH]
+    PREDICATE_INDEX_DICT = {obj: i for i, obj in enumerate(PREDICATE_LIST)}
+
+    def __init__(self, map_size):
+        self.map_size = map_size
+        self.cell_num = map_size * map_size
+        self.var_num = len(VariableTable.PREDICATE_LIST) * self.cell_num
+
+        # Forward tables: predicate index -> index_pos -> var (index 0 is unused, index_pos starts at 1).
+        self.forward_table = []
+        for i in range(len(VariableTable.PREDICATE_LIST)):
+            self.forward_table.append(array('I', [0]) + array('I', range(i + 1, self.var_num + 1, 4)))
+
+        # Reverse tables: var -> index_pos and var -> predicate index (index 0 is unused).
+        self.cell_table = array('I', [0])
+        self.predicate_table = bytearray(self.var_num + 1)
+        for index_pos in range(1, self.cell_num + 1):
+            self.cell_table.extend([index_pos] * len(VariableTable.PREDICATE_LIST))
+        for i in range(len(VariableTable.PREDICATE_LIST)):
+            self.predicate_table[i + 1::4] = bytes([i]) * self.cell_num
+        self.name_dict = {}     # literal -> readable name, filled on demand by the trace writer.
+
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+    def get_literal(self, index_pos, obj: Object, sign='+'):    # sign='-': not operator
+        predicate_index = VariableTable.PREDICATE_INDEX_DICT.get(obj)
+        if predicate_index is None:
+            raise TypeError('Error: ' + self.get_literal.__name__)
+        literal = self.forward_table[predicate_index][index_pos]
+        if sign == '-':
+            literal = -literal
+        return literal
+
+
+    def get_first_free_var(self):
+        # Variables above the cell variables are free for the KB (e.g. clause group selectors).
+        return self.var_num + 1
+
+
+    def get_map_pos(self, index_pos):
+        return (index_pos - 1) % self.map_size + 1, (index_pos - 1) // self.map_size + 1
+
+
+    def get_name(self, literal):
+        name = self.name_dict.get(literal)
+        if name is None:
+            name = self.name_dict[literal] = self.make_name(literal)
+        return name
+
+
+    def make_name(self, literal):
+        var = abs(literal)
+        if not 0 < var <= self.var_num:
+            name = 'x' + str(var)
+        else:
+            obj = VariableTable.PREDICATE_LIST[self.predicate_table[var]]
+            name = obj.value + str(self.get_map_pos(self.cell_table[var])).replace(' ', '')
+        if literal < 0:
+            return '-' + name
+        return name
+
+
+    def format_clause_list(self, clause_list):
+        return '[' + ', '.join('[' + ', '.join(self.get_name(literal) for literal in clause) + ']'
+                               for clause in clause_list) + ']'
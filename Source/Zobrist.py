@@ -0,0 +1,80 @@
+import random
+
+SEED = 0x5EED     # Fixed, so hashes are comparable across runs and processes.
+
+
+class ZobristState:
+    # Incremental 64-bit Zobrist hash of the agent's state: position, heading, the gold and Wumpus still on the map,
+    # the explored cells and whether an arrow has been spent. Every component has a random key per value and the
+    # hash is the XOR of the keys of the current values, so each change is one or two XORs.
+    def __init__(self, cell_num, heading_list):
+        rng = random.Random(SEED)
+        self.position_key_list = [rng.getrandbits(64) for _ in range(cell_num + 1)]    # index_pos -> key
+        self.gold_key_list = [rng.getrandbits(64) for _ in range(cell_num + 1)]
+        self.wumpus_key_list = [rng.getrandbits(64) for _ in range(cell_num + 1)]
+        self.explored_key_list = [rng.getrandbits(64) for _ in range(cell_num + 1)]
+        self.heading_key_dict = {heading: rng.getrandbits(64) for heading in heading_list}
+        self.arrow_key = rng.getrandbits(64)
+        self.value = 0
+
+
+    def set_position(self, index_pos):
+        self.value ^= self.position_key_list[index_pos]
+
+    def move(self, index_pos, next_index_pos):
+        self.value ^= self.position_key_list[index_pos] ^ self.position_key_list[next_index_pos]
+
+    def turn(self, heading, next_heading):
+        self.value ^= self.heading_key_dict[heading] ^ self.heading_key_dict[next_heading]
+
+    def toggle_gold(self, index_pos):
+        self.value ^= self.gold_key_list[index_pos]
+
+    def toggle_wumpus(self, index_pos):
+        self.value ^= self.wumpus_key_list[index_pos]
+
+    def toggle_explored(self, index_pos):
+        self.value ^= self.explored_key_list[index_pos]
+
+    def toggle_arrow(self):
+        self.value ^= self.arrow_key
+
+    def set_heading(self, heading):
+        self.value ^= self.heading_key_dict[heading]
+
+    def get_visit_key(self, index_pos, heading, next_index_pos):
+        # The hash with the agent moved from index_pos to next_index_pos and the heading left out, the way it
+        # enters a cell does not change what a visit there learns.
+        return (self.value ^ self.position_key_list[index_pos] ^ self.position_key_list[next_index_pos] ^
+                self.heading_key_dict[heading])
+
+
+class VisitedStateTable:
+    # Visit key -> number of the visit that first reached the state, see ZobristState.get_visit_key(). Expanding a
+    # cell into a key seen before means visiting it again with nothing changed since, it would only repeat the same
+    # decisions, so the expansion is pruned and the search goes on with the next one.
+    def __init__(self):
+        self.step_dict = {}
+        self.step_count = 0
+        self.repeat_count = 0
+
+
+    def visit(self, value):
+        self.step_count += 1
+        if value not in self.step_dict:
+            self.step_dict[value] = self.step_count
+
+
+    def get_repeated_step(self, value):
+        # Returns the step of the earlier visit and counts the repeat, or None for a new state.
+        step = self.step_dict.get(value)
+        if step is not None:
+            self.repeat_count += 1
+        return step
+
+
+    def __contains__(self, value):
+        return value in self.step_dict
+
+    def __len__(self):
+        return len(self.step_dict)
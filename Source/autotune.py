@@ -0,0 +1,128 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+from itertools import count
+
+import Algorithms
+import SolverBackends
+import map_generator
+
+INPUT_DIR = os.path.join(SolverBackends.BASE_DIR, 'Assets', 'Input')
+
+NEW = 'new'
+ADD = 'add'
+SOLVE = 'solve'
+MODEL = 'model'
+DELETE = 'delete'
+
+
+class RecordingSolver:
+    # Forwards to a real solver and logs every call under the number of its solver. The KB keeps a session per
+    # variable component, so one log interleaves many solvers: merging two components deletes one session and adds
+    # its clauses to the other, deleting a clause drops only the session of its component.
+    def __init__(self, solver, workload, session_id):
+        self.solver = solver
+        self.workload = workload
+        self.session_id = session_id
+        self.workload.append((NEW, self.session_id, ()))
+
+    def add_clause(self, clause):
+        self.workload.append((ADD, self.session_id, tuple(clause)))
+        self.solver.add_clause(clause)
+
+    def solve(self, assumptions=[]):
+        self.workload.append((SOLVE, self.session_id, tuple(assumptions)))
+        return self.solver.solve(assumptions=assumptions)
+
+    def get_model(self):
+        self.workload.append((MODEL, self.session_id, ()))
+        return self.solver.get_model()
+
+    def delete(self):
+        self.workload.append((DELETE, self.session_id, ()))
+        self.solver.delete()
+
+
+def record_workload(map_filename):
+    workload = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        agent_brain = Algorithms.AgentBrain(map_filename, os.path.join(tmp_dir, 'result.txt'))
+        factory = agent_brain.KB.solver_factory
+        session_counter = count()
+        agent_brain.KB.solver_factory = lambda: RecordingSolver(factory(), workload, next(session_counter))
+        agent_brain.solve_wumpus_world()
+    return agent_brain.map_size, workload
+
+
+def replay_workload(workload, factory):
+    # Replays the calls of every session on its own solver of the given backend, in the recorded order.
+    start = time.perf_counter()
+    solver_dict = {}    # session number -> solver
+    for op, session_id, args in workload:
+        if op == ADD:
+            solver_dict[session_id].add_clause(args)
+        elif op == SOLVE:
+            solver_dict[session_id].solve(assumptions=list(args))
+        elif op == MODEL:
+            solver_dict[session_id].get_model()
+        elif op == NEW:
+            solver_dict[session_id] = factory()
+        else:
+            solver_dict.pop(session_id).delete()
+    for solver in solver_dict.values():
+        solver.delete()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pick the fastest SAT backend per map size bucket.')
+    parser.add_argument('maps', nargs='*', help='map files (default: Assets/Input/*.txt)')
+    parser.add_argument('--size', type=int, action='append', help='size of generated maps (repeatable, default: 10 25)')
+    parser.add_argument('--generated', type=int, default=3, help='generated maps per size')
+    parser.add_argument('--backend', action='append', help='backend to try (repeatable, default: all available)')
+    parser.add_argument('--repeat', type=int, default=3, help='replays per workload, the best one is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=SolverBackends.TUNING_FILE, help='tuning file to write')
+    args = parser.parse_args()
+
+    backend_list = args.backend or SolverBackends.get_available_backend_list()
+    size_list = args.size or [10, 25]
+
+    workload_list = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        map_list = args.maps or sorted(glob.glob(os.path.join(INPUT_DIR, '*.txt')))
+        for map_size in size_list:
+            for i in range(args.generated):
+                map_filename = os.path.join(tmp_dir, 'generated_%d_%d.txt' % (map_size, i))
+                map_generator.generate_map_file(map_size, args.seed + 1000 * map_size + i, map_filename)
+                map_list.append(map_filename)
+        for map_filename in map_list:
+            workload_list.append(record_workload(map_filename))
+
+    bucket_time_dict = {}   # bucket -> backend -> seconds
+    for map_size, workload in workload_list:
+        bucket = SolverBackends.get_size_bucket(map_size)
+        for name in backend_list:
+            factory = SolverBackends.get_backend(name)
+            best = min(replay_workload(workload, factory) for _ in range(args.repeat))
+            time_dict = bucket_time_dict.setdefault(bucket, {})
+            time_dict[name] = time_dict.get(name, 0.0) + best
+
+    tuning = SolverBackends.load_tuning(args.output)
+    tuning.setdefault('buckets', {})
+    tuning.setdefault('timings', {})
+    for bucket, time_dict in sorted(bucket_time_dict.items()):
+        choice = min(time_dict, key=time_dict.get)
+        tuning['buckets'][bucket] = choice
+        tuning['timings'][bucket] = time_dict
+        print('bucket <= %-4s -> %-12s %s' % (bucket, choice,
+                                              ', '.join('%s %.2fms' % (name, t * 1e3)
+                                                        for name, t in sorted(time_dict.items(), key=lambda x: x[1]))))
+    SolverBackends.save_tuning(tuning, args.output)
+    print('Saved ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Headless: nothing here may import pygame, directly or through Specification.
+import Algorithms
+import KnowledgeBase
+import SolverBackends
+import TraceSink
+
+FIELD_LIST = ['map', 'size', 'score', 'actions', 'moves', 'sat_calls', 'queries', 'time', 'error']
+
+
+def find_maps(input_list):
+    # Every input is a map file, a directory of *.txt maps or a glob pattern.
+    map_list = []
+    for pattern in input_list:
+        if os.path.isdir(pattern):
+            map_list.extend(sorted(glob.glob(os.path.join(pattern, '*.txt'))))
+        elif os.path.isfile(pattern):
+            map_list.append(pattern)
+        else:
+            map_list.extend(sorted(glob.glob(pattern, recursive=True)))
+    return list(dict.fromkeys(map_list))
+
+
+def solve_map(map_filename, agent_kwargs, trace_dir=None):
+    # Worker task: one map, one row. A failing map is reported in the row instead of stopping the batch.
+    row = {'map': map_filename}
+    start = time.perf_counter()
+    try:
+        if trace_dir is None:
+            trace = TraceSink.TraceSink(os.devnull, level=TraceSink.OFF)
+        else:
+            trace = TraceSink.TraceSink(os.path.join(trace_dir, os.path.basename(map_filename)))
+        agent_brain = Algorithms.AgentBrain(map_filename, trace.filename, trace=trace, **agent_kwargs)
+        action_count = 0
+        move_count = 0
+        for event in agent_brain.iter_actions():
+            action_count += 1
+            if event.action == Algorithms.Action.MOVE_FORWARD:
+                move_count += 1
+        stats = agent_brain.KB.get_stats()
+        row.update({'size': agent_brain.map_size,
+                    'score': agent_brain.score,
+                    'actions': action_count,
+                    'moves': move_count,
+                    'sat_calls': stats['resolved_by_solver'] + stats['backbone_solver_calls'],
+                    'queries': stats['queries']})
+    except Exception as e:
+        row['error'] = type(e).__name__ + ': ' + str(e)
+    row['time'] = round(time.perf_counter() - start, 4)
+    return row
+
+
+class RowWriter:
+    # Streams rows as they complete, flushed one by one so a long batch can be followed live.
+    def __init__(self, file, output_format):
+        self.file = file
+        self.output_format = output_format
+        if output_format == 'csv':
+            self.writer = csv.DictWriter(file, FIELD_LIST, extrasaction='ignore')
+            self.writer.writeheader()
+        elif output_format == 'text':
+            self.file.write('%-28s %6s %8s %8s %8s %10s %8s %10s\n' % ('map', 'size', 'score', 'actions', 'moves',
+                                                                        'sat calls', 'queries', 'time s'))
+
+
+    def write(self, row):
+        if self.output_format == 'csv':
+            self.writer.writerow(row)
+        elif self.output_format == 'jsonl':
+            self.file.write(json.dumps(row) + '\n')
+        elif 'error' in row:
+            self.file.write('%-28s error: %s\n' % (os.path.basename(row['map']), row['error']))
+        else:
+            self.file.write('%-28s %6d %8d %8d %8d %10d %8d %10.3f\n' % (os.path.basename(row['map']), row['size'],
+                                                                          row['score'], row['actions'], row['moves'],
+                                                                          row['sat_calls'], row['queries'],
+                                                                          row['time']))
+        self.file.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve Wumpus World maps headless across worker processes.')
+    parser.add_argument('inputs', nargs='+', help='map files, directories of *.txt maps or glob patterns')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: %(default)s)')
+    parser.add_argument('--format', default='text', choices=['text', 'csv', 'jsonl'], help='row format')
+    parser.add_argument('--output', help='file to write the rows to (default: stdout)')
+    parser.add_argument('--trace-dir', help='write the result trace of every map to this directory')
+    parser.add_argument('--mode', default=KnowledgeBase.KnowledgeBase.INCREMENTAL,
+                        choices=KnowledgeBase.KnowledgeBase.MODE_LIST, help='KnowledgeBase mode')
+    parser.add_argument('--solver', default=SolverBackends.DEFAULT_BACKEND,
+                        help='solver backend, or auto for the autotuned choice (default: %(default)s)')
+    parser.add_argument('--strategy', default=Algorithms.AgentBrain.DFS, choices=Algorithms.AgentBrain.STRATEGY_LIST,
+                        help='exploration strategy (default: %(default)s)')
+    parser.add_argument('--max-risk', type=float, help='hazard probability the agent accepts once logic is stuck')
+    args = parser.parse_args()
+
+    map_list = find_maps(args.inputs)
+    if not map_list:
+        parser.error('no map files found')
+    if args.trace_dir is not None:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    agent_kwargs = {'kb_mode': args.mode, 'solver_name': args.solver, 'strategy': args.strategy,
+                    'max_risk': args.max_risk}
+
+    file = sys.stdout if args.output is None else open(args.output, 'w', newline='')
+    row_writer = RowWriter(file, args.format)
+    error_count = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(map_list)))) as executor:
+            future_list = [executor.submit(solve_map, map_filename, agent_kwargs, args.trace_dir)
+                           for map_filename in map_list]
+            for future in as_completed(future_list):
+                row = future.result()
+                error_count += 'error' in row
+                row_writer.write(row)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    total_time = time.perf_counter() - start
+    print('%d maps, %d failed, %.2f s, %.2f maps/s' % (len(map_list), error_count, total_time,
+                                                       len(map_list) / total_time), file=sys.stderr)
+    sys.exit(1 if error_count else 0)
+
+
+if __name__ == '__main__':
+    main()
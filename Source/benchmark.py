@@ -0,0 +1,74 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import Algorithms
+import KnowledgeBase
+import SolverBackends
+
+# Specification imports pygame, so the benchmark resolves its own paths.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_DIR = os.path.join(BASE_DIR, 'Assets', 'Input')
+
+
+def run_map(map_filename, kb_mode, solver_name=SolverBackends.DEFAULT_BACKEND,
+            gc_threshold=KnowledgeBase.KnowledgeBase.GC_THRESHOLD, max_risk=None,
+            strategy=Algorithms.AgentBrain.DFS):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_filename = os.path.join(tmp_dir, 'result.txt')
+        start = time.perf_counter()
+        agent_brain = Algorithms.AgentBrain(map_filename, output_filename, kb_mode, solver_name, gc_threshold,
+                                            max_risk, strategy)
+        action_list, _, _ = agent_brain.solve_wumpus_world()
+        total_time = time.perf_counter() - start
+
+    stats = agent_brain.KB.get_stats()
+    stats['actions'] = len(action_list)
+    stats['moves'] = action_list.count(Algorithms.Action.MOVE_FORWARD)
+    stats['score'] = agent_brain.score
+    stats['total_time'] = total_time
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare KnowledgeBase modes on the Wumpus World maps.')
+    parser.add_argument('maps', nargs='*', help='map files (default: Assets/Input/*.txt)')
+    parser.add_argument('--mode', action='append', choices=KnowledgeBase.KnowledgeBase.MODE_LIST,
+                        help='KnowledgeBase mode to run (repeatable, default: all)')
+    parser.add_argument('--solver', default=SolverBackends.DEFAULT_BACKEND,
+                        help='solver backend, or auto for the autotuned choice (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per map and mode, the best one is reported')
+    parser.add_argument('--gc-threshold', type=int, default=KnowledgeBase.KnowledgeBase.GC_THRESHOLD,
+                        help='KB size that triggers simplification (default: %(default)s)')
+    parser.add_argument('--strategy', default=Algorithms.AgentBrain.DFS, choices=Algorithms.AgentBrain.STRATEGY_LIST,
+                        help='exploration strategy (default: %(default)s)')
+    parser.add_argument('--max-risk', type=float, help='hazard probability the agent accepts once logic is stuck')
+    args = parser.parse_args()
+
+    map_list = args.maps or sorted(glob.glob(os.path.join(INPUT_DIR, '*.txt')))
+    mode_list = args.mode or KnowledgeBase.KnowledgeBase.MODE_LIST
+
+    print('%-16s %-12s %8s %8s %8s %12s %10s %10s %10s' % ('map', 'mode', 'actions', 'moves', 'queries', 'us/query',
+                                                            'kb ms', 'peak kb', 'total s'))
+    for map_filename in map_list:
+        for kb_mode in mode_list:
+            best = None
+            for _ in range(args.repeat):
+                stats = run_map(map_filename, kb_mode, args.solver, args.gc_threshold, args.max_risk,
+                                args.strategy)
+                stats['kb_time'] = stats['query_time'] + stats['backbone_time']
+                if best is None or stats['kb_time'] < best['kb_time']:
+                    best = stats
+            kb_time = best['kb_time']
+            print('%-16s %-12s %8d %8d %8d %12.1f %10.2f %10d %10.3f' % (os.path.basename(map_filename), kb_mode,
+                                                                         best['actions'], best['moves'],
+                                                                         best['queries'],
+                                                                         best['avg_query_time'] * 1e6,
+                                                                         kb_time * 1e3, best['peak_clauses'],
+                                                                         best['total_time']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import json
+import struct
+
+import TraceSink
+
+# Bytes after the kind byte of the binary records without clause lists.
+FIXED_SIZE_DICT = {TraceSink.ACTION: 9, TraceSink.MOVE: 4, TraceSink.INFER: 4, TraceSink.TRY: 4, TraceSink.SAFE: 4,
+                   TraceSink.RISK: 8, TraceSink.LOOP: 8}
+KB_KIND_LIST = [TraceSink.KB_DUMP, TraceSink.KB_UPDATE, TraceSink.KB_DELTA]
+
+
+def open_trace(filename, compression=None):
+    if compression is None:
+        return open(filename, 'rb')
+    if compression not in TraceSink.COMPRESSION_DICT:
+        raise TypeError('Error: Unknown or unavailable trace compression ' + str(compression) + '.')
+    return TraceSink.COMPRESSION_DICT[compression](filename, 'rb')
+
+
+def read_kb_events(filename, encoder='text', compression=None):
+    # The KB events of a trace as TraceEvents. Clauses are tuples of literals, of names like -P(1,2) for text
+    # traces. Text has no cell for KB events, their map_pos is None.
+    with open_trace(filename, compression) as file:
+        if encoder == 'text':
+            yield from read_text_kb_events(file)
+        elif encoder == 'jsonl':
+            yield from read_json_kb_events(file)
+        elif encoder == 'binary':
+            yield from read_binary_kb_events(file.read())
+        else:
+            raise TypeError('Error: Unknown trace encoder ' + str(encoder) + '.')
+
+
+def parse_clause_list(text):
+    # Inverse of VariableTable.format_clause_list(), names have no spaces.
+    if text == '[]':
+        return []
+    return [tuple(clause_text.split(', ')) if clause_text else () for clause_text in text[2:-2].split('], [')]
+
+
+def read_text_kb_events(file):
+    added_list = None
+    for line in file:
+        line = line.decode().rstrip('\n')
+        if line.startswith('['):
+            yield TraceSink.TraceEvent(TraceSink.KB_DUMP, None, parse_clause_list(line))
+        elif line.startswith('KB: '):
+            yield TraceSink.TraceEvent(TraceSink.KB_UPDATE, None, parse_clause_list(line[4:]))
+        elif line.startswith('KB+: '):
+            added_list = parse_clause_list(line[5:])
+        elif line.startswith('KB-: '):
+            yield TraceSink.TraceEvent(TraceSink.KB_DELTA, None, (added_list, parse_clause_list(line[5:])))
+
+
+def read_json_kb_events(file):
+    for line in file:
+        record = json.loads(line)
+        kind = TraceSink.KIND_NAME_LIST.index(record['kind'])
+        map_pos = tuple(record['pos']) if 'pos' in record else None
+        if kind == TraceSink.KB_DUMP or kind == TraceSink.KB_UPDATE:
+            yield TraceSink.TraceEvent(kind, map_pos, [tuple(clause) for clause in record['clauses']])
+        elif kind == TraceSink.KB_DELTA:
+            yield TraceSink.TraceEvent(kind, map_pos, ([tuple(clause) for clause in record['added']],
+                                                       [tuple(clause) for clause in record['removed']]))
+
+
+def read_binary_kb_events(data):
+    if data[:len(TraceSink.BINARY_MAGIC)] != TraceSink.BINARY_MAGIC:
+        raise TypeError('Error: Not a binary trace.')
+    offset = len(TraceSink.BINARY_MAGIC)
+    while offset < len(data):
+        kind = data[offset]
+        offset += 1
+        if kind in FIXED_SIZE_DICT:
+            offset += FIXED_SIZE_DICT[kind]
+        elif kind == TraceSink.QUERY:
+            literal_count = struct.unpack_from('<H', data, offset + 1)[0]
+            offset += 3 + 4 * literal_count
+        elif kind in KB_KIND_LIST:
+            map_pos = struct.unpack_from('<hh', data, offset)
+            clause_list, offset = unpack_clause_list(data, offset + 4)
+            if kind == TraceSink.KB_DELTA:
+                removed_list, offset = unpack_clause_list(data, offset)
+                yield TraceSink.TraceEvent(kind, map_pos, (clause_list, removed_list))
+            else:
+                yield TraceSink.TraceEvent(kind, map_pos, clause_list)
+        else:
+            raise TypeError('Error: Unknown trace record ' + str(kind) + ' at byte ' + str(offset - 1) + '.')
+
+
+def unpack_clause_list(data, offset):
+    clause_count = struct.unpack_from('<I', data, offset)[0]
+    offset += 4
+    clause_list = []
+    for _ in range(clause_count):
+        literal_count = struct.unpack_from('<H', data, offset)[0]
+        clause_list.append(struct.unpack_from('<' + str(literal_count) + 'i', data, offset + 2))
+        offset += 2 + 4 * literal_count
+    return clause_list, offset
+
+
+def iter_kb_states(event_iter):
+    # (step, map_pos, KB) after every KB event, the KB is a dict used as an ordered set and is updated in place.
+    # A delta removes first and adds second, a clause in both lists moves to the end, so the clauses come out in
+    # the order of a full dump at the same step.
+    kb_dict = None
+    for step, event in enumerate(event_iter):
+        if event.kind == TraceSink.KB_DELTA:
+            if kb_dict is None:
+                raise TypeError('Error: The trace starts with a KB delta, it has no checkpoint to apply it to.')
+            added_list, removed_list = event.value
+            for clause in removed_list:
+                kb_dict.pop(clause, None)
+            for clause in added_list:
+                kb_dict[clause] = None
+        else:
+            kb_dict = dict.fromkeys(event.value)
+        yield step, event.map_pos, kb_dict
+
+
+def rebuild_kb(filename, step=None, encoder='text', compression=None):
+    # The clause list after KB event number step (counted from 0, None for the last one), and its map_pos.
+    result = None
+    for kb_step, map_pos, kb_dict in iter_kb_states(read_kb_events(filename, encoder, compression)):
+        result = map_pos, list(kb_dict)
+        if kb_step == step:
+            return result
+    if result is None or step is not None:
+        raise TypeError('Error: The trace has no KB step ' + str(step) + '.')
+    return result
+
+
+def format_clause_list(clause_list):
+    return '[' + ', '.join('[' + ', '.join(str(literal) for literal in clause) + ']' for clause in clause_list) + ']'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the KB of a trace at any step from its checkpoints and '
+                                                 'deltas.')
+    parser.add_argument('trace', help='trace file written by TraceSink (e.g. Assets/Output/result_1.txt)')
+    parser.add_argument('--step', type=int, help='KB event to rebuild, counted from 0 (default: the last one)')
+    parser.add_argument('--encoder', default='text', choices=list(TraceSink.ENCODER_DICT))
+    parser.add_argument('--compression', choices=list(TraceSink.COMPRESSION_DICT))
+    parser.add_argument('--count', action='store_true', help='only print the number of KB steps')
+    args = parser.parse_args()
+
+    if args.count:
+        print(sum(1 for _ in read_kb_events(args.trace, args.encoder, args.compression)))
+        return
+    map_pos, clause_list = rebuild_kb(args.trace, args.step, args.encoder, args.compression)
+    if map_pos is not None:
+        print('Cell: ' + str(map_pos))
+    print(str(len(clause_list)) + ' clauses')
+    print(format_clause_list(clause_list))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ import pygame
 import os
 import sys
 
+import MapValidator
+
 # Initialize pygame
 pygame.init()
 
@@ -155,57 +157,18 @@ def save_map():
     os.makedirs(folder, exist_ok=True)
     os.makedirs(output_folder, exist_ok=True)
 
-    # Create a copy of the grid for output
-    output_grid = [row[:] for row in grid]
-
-    # Dictionary to track adjacent effects
-    adj_effects = {}
-    for row in range(GRID_HEIGHT):
-        for col in range(GRID_WIDTH):
-            if output_grid[row][col] == "W":
-                # Add stench (S) to adjacent cells
-                for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    new_row, new_col = row + dr, col + dc
-                    if 0 <= new_row < GRID_HEIGHT and 0 <= new_col < GRID_WIDTH:
-                        pos = (new_row, new_col)
-                        adj_effects[pos] = adj_effects.get(pos, "") + "S"
-            elif output_grid[row][col] == "P":
-                # Add breeze (B) to adjacent cells
-                for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    new_row, new_col = row + dr, col + dc
-                    if 0 <= new_row < GRID_HEIGHT and 0 <= new_col < GRID_WIDTH:
-                        pos = (new_row, new_col)
-                        adj_effects[pos] = adj_effects.get(pos, "") + "B"
-
-    # Apply effects to the grid
-    for (row, col), effects in adj_effects.items():
-        current = output_grid[row][col]
-        if current in ["A", "P", "G", "W", "-", "B", "S"]:
-            # Combine effects without duplicating
-            unique_effects = "".join(sorted(set(effects)))
-            if current == ".":
-                output_grid[row][col] = unique_effects
-            else:
-                output_grid[row][col] = current + unique_effects
-        elif current == ".":
-            output_grid[row][col] = effects
-
-    # Replace all remaining '.' with '-'
-    for row in range(GRID_HEIGHT):
-        for col in range(GRID_WIDTH):
-            if output_grid[row][col] == ".":
-                output_grid[row][col] = "-"
+    # Breeze and Stench are derived from the Pits and Wumpuses the way MapValidator repairs a map,
+    # unknown cells ('.') are saved as empty.
+    grid_text = "\n".join(".".join("-" if cell == "." else cell for cell in row) for row in grid)
+    layers, _ = MapValidator.parse_map(f"{GRID_HEIGHT}\n" + grid_text)
+    map_text = MapValidator.format_map(MapValidator.repair_layers(layers))
 
     # Save as custom_map.txt (will overwrite if exists)
     map_path = os.path.join(folder, "custom_map.txt")
     out_path = os.path.join(output_folder, "custom_result.txt")
 
     with open(map_path, "w") as f:
-        f.write(f"{GRID_HEIGHT}\n")
-        for row in output_grid:
-            # Join cells with exactly one dot
-            formatted_row = ".".join(row)
-            f.write(formatted_row + "\n")
+        f.write(map_text)
 
     # Create empty output file
     with open(out_path, "w") as f:
@@ -213,8 +176,7 @@ def save_map():
 
     print(f"Map saved as custom_map.txt in {map_path}")
     print("Format:")
-    for row in output_grid:
-        print(".".join(row))
+    print(map_text, end="")
 
 def clear_grid():
     global grid
@@ -0,0 +1,92 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import MapValidator
+
+PIT_DENSITY = 0.1
+WUMPUS_DENSITY = 0.05
+GOLD_DENSITY = 0.05
+SAFE_RADIUS = 1         # Cells within this Manhattan distance of the agent hold no Pit, Wumpus or Gold.
+SHARD_SIZE = 100        # Maps per shard directory of a corpus.
+
+
+def generate_layers(map_size, seed, pit_density=PIT_DENSITY, wumpus_density=WUMPUS_DENSITY, gold_density=GOLD_DENSITY,
+                    safe_radius=SAFE_RADIUS, agent_pos=None):
+    # MapLayers of a random map. Every cell draws once: Pit, else Wumpus, else Gold by the densities, so no cell
+    # holds two of them. Breeze and Stench are derived from the hazards, so the map passes MapValidator.
+    if pit_density + wumpus_density + gold_density > 1.0:
+        raise TypeError('Error: The object densities add up to more than 1.')
+    if agent_pos is None:
+        agent_pos = (map_size - 1, 0)   # Bottom left, as in the hand made maps.
+    rng = np.random.default_rng(seed)
+    draw = rng.random((map_size, map_size))
+    row, column = np.ogrid[:map_size, :map_size]
+    free = np.abs(row - agent_pos[0]) + np.abs(column - agent_pos[1]) > safe_radius
+    free[agent_pos] = False
+
+    pit = free & (draw < pit_density)
+    wumpus = free & (draw >= pit_density) & (draw < pit_density + wumpus_density)
+    gold = free & (draw >= pit_density + wumpus_density) & (draw < pit_density + wumpus_density + gold_density)
+    agent = np.zeros((map_size, map_size), dtype=bool)
+    agent[agent_pos] = True
+    return MapValidator.repair_layers(MapValidator.MapLayers(gold, pit, wumpus, None, None, agent))
+
+
+def generate_map_file(map_size, seed, map_filename, pit_density=PIT_DENSITY, wumpus_density=WUMPUS_DENSITY,
+                      gold_density=GOLD_DENSITY, safe_radius=SAFE_RADIUS):
+    MapValidator.write_map_file(generate_layers(map_size, seed, pit_density, wumpus_density, gold_density,
+                                                safe_radius), map_filename)
+
+
+def generate_shard(out_dir, shard, index_list, seed, min_size, max_size, generator_kwargs):
+    shard_dir = os.path.join(out_dir, 'shard_%04d' % shard)
+    os.makedirs(shard_dir, exist_ok=True)
+    for index in index_list:
+        # Own stream per map: a map only depends on (seed, index), not on the sharding or the worker count.
+        rng = np.random.default_rng([seed, index])
+        map_size = int(rng.integers(min_size, max_size + 1))
+        generate_map_file(map_size, rng, os.path.join(shard_dir, 'map_%06d.txt' % index), **generator_kwargs)
+    return len(index_list)
+
+
+def generate_corpus(out_dir, count, seed=0, min_size=10, max_size=10, shard_size=SHARD_SIZE, worker_count=None,
+                    **generator_kwargs):
+    # count maps in shard_size map directories, one shard per process pool task. Returns the number written.
+    shard_list = [list(range(start, min(start + shard_size, count))) for start in range(0, count, shard_size)]
+    with ProcessPoolExecutor(max_workers=worker_count) as executor:
+        future_list = [executor.submit(generate_shard, out_dir, shard, index_list, seed, min_size, max_size,
+                                       generator_kwargs) for shard, index_list in enumerate(shard_list)]
+        return sum(future.result() for future in future_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate seeded random Wumpus World maps in sharded directories.')
+    parser.add_argument('out_dir', help='corpus directory, maps go to shard_NNNN/map_NNNNNN.txt')
+    parser.add_argument('--count', type=int, default=100, help='maps to generate (default: %(default)s)')
+    parser.add_argument('--min-size', type=int, default=10)
+    parser.add_argument('--max-size', type=int, default=10)
+    parser.add_argument('--pit-density', type=float, default=PIT_DENSITY)
+    parser.add_argument('--wumpus-density', type=float, default=WUMPUS_DENSITY)
+    parser.add_argument('--gold-density', type=float, default=GOLD_DENSITY)
+    parser.add_argument('--safe-radius', type=int, default=SAFE_RADIUS,
+                        help='Manhattan radius around the agent kept free of objects (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    args = parser.parse_args()
+    if not 2 <= args.min_size <= args.max_size:
+        parser.error('sizes must satisfy 2 <= min-size <= max-size')
+
+    start = time.perf_counter()
+    count = generate_corpus(args.out_dir, args.count, args.seed, args.min_size, args.max_size, args.shard_size,
+                            args.workers, pit_density=args.pit_density, wumpus_density=args.wumpus_density,
+                            gold_density=args.gold_density, safe_radius=args.safe_radius)
+    print('%d maps in %s, %.2f s' % (count, args.out_dir, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
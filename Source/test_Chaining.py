@@ -0,0 +1,108 @@
+import random
+import unittest
+
+import SolverBackends
+from Chaining import BackwardChainer, ForwardChainer
+from ClauseStore import ClauseStore
+
+VAR_COUNT = 10
+
+
+def solver_entails(clause_list, literal):
+    solver = SolverBackends.get_backend(SolverBackends.DEFAULT_BACKEND)()
+    for clause in clause_list:
+        solver.add_clause(clause)
+    result = not solver.solve(assumptions=[-literal])
+    solver.delete()
+    return result
+
+
+def get_random_clause_list(rng, horn):
+    # Consistent clause lists: the first literal of every clause agrees with a hidden assignment. Horn clauses
+    # keep at most one positive literal, a negative one stands in for any other.
+    hidden_list = [None] + [var if rng.random() < 0.5 else -var for var in range(1, VAR_COUNT + 1)]
+    clause_list = []
+    for _ in range(rng.randint(3, 20)):
+        var_list = rng.sample(range(1, VAR_COUNT + 1), rng.randint(1, 3))
+        clause = [hidden_list[var_list[0]]]
+        for var in var_list[1:]:
+            positive = rng.random() < 0.5 and not (horn and any(literal > 0 for literal in clause))
+            clause.append(var if positive else -var)
+        clause_list.append(clause)
+    return clause_list
+
+
+class TestForwardChainer(unittest.TestCase):
+    def test_rules(self):
+        chainer = ForwardChainer()
+        for clause in [[3, -1, -2], [-3, -4], [1]]:
+            self.assertTrue(chainer.add_clause(clause))
+        self.assertFalse(chainer.entails(3))
+        chainer.add_clause([2])
+        self.assertTrue(chainer.entails(3))
+        self.assertTrue(chainer.entails(-4))    # 4 would derive FALSUM.
+        self.assertFalse(chainer.entails(4))
+
+    def test_non_horn(self):
+        chainer = ForwardChainer()
+        self.assertFalse(chainer.add_clause([1, 2]))
+        chainer.add_clause([-1, 3])
+        # Without the non Horn clause, not entailing 3 would be decided as False.
+        self.assertIsNone(chainer.entails(3))
+
+    def test_matches_solver(self):
+        for seed in range(50):
+            rng = random.Random(seed)
+            horn = seed % 2 == 0
+            clause_list = get_random_clause_list(rng, horn)
+            chainer = ForwardChainer()
+            for clause in clause_list:
+                chainer.add_clause(clause)
+            for var in range(1, VAR_COUNT + 1):
+                for literal in [var, -var]:
+                    result = chainer.entails(literal)
+                    # Horn clauses alone decide every literal query.
+                    if horn:
+                        self.assertIsNotNone(result)
+                    if result is not None:
+                        self.assertEqual(result, solver_entails(clause_list, literal),
+                                         'seed ' + str(seed) + ' literal ' + str(literal))
+
+
+class TestBackwardChainer(unittest.TestCase):
+    def test_proof(self):
+        store = ClauseStore()
+        chainer = BackwardChainer(store)
+        for clause in [[1], [-1, 2], [-2, -3, 4]]:
+            store.add(clause)
+            chainer.on_add()
+        self.assertFalse(chainer.prove(4))
+        store.add([3])
+        chainer.on_add()
+        self.assertTrue(chainer.prove(4))
+        store.discard([3])
+        chainer.on_delete()
+        self.assertFalse(chainer.prove(4))
+
+    def test_matches_solver(self):
+        # Backward chaining is sound but not complete: every goal it proves is entailed.
+        proven_count = 0
+        for seed in range(50):
+            rng = random.Random(seed)
+            clause_list = get_random_clause_list(rng, False)
+            store = ClauseStore()
+            chainer = BackwardChainer(store)
+            for clause in clause_list:
+                store.add(clause)
+                chainer.on_add()
+            for var in range(1, VAR_COUNT + 1):
+                for literal in [var, -var]:
+                    if chainer.prove(literal):
+                        proven_count += 1
+                        self.assertTrue(solver_entails(clause_list, literal),
+                                        'seed ' + str(seed) + ' literal ' + str(literal))
+        self.assertGreater(proven_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from Components import VariableComponents
+from EntailmentCache import EntailmentCache
+
+
+class TestEntailmentCache(unittest.TestCase):
+    def setUp(self):
+        self.components = VariableComponents()
+        self.cache = EntailmentCache(self.components)
+        self.components.link_clause((1, 2), 1)
+
+    def test_fact(self):
+        self.cache.store(1, True, 1)
+        # A fact answers both polarities of its variable.
+        self.assertTrue(self.cache.lookup(1))
+        self.assertFalse(self.cache.lookup(-1))
+        self.assertTrue(self.cache.is_decided(1))
+
+        # Adding clauses keeps an entailment, deleting one from the component may take it away.
+        self.components.link_clause((-2, 3), 2)
+        self.assertTrue(self.cache.lookup(1))
+        self.components.unlink_clause((-2, 3), 3)
+        self.assertIsNone(self.cache.lookup(1))
+        self.assertNotIn(1, self.cache.fact_dict)
+
+    def test_not_entailed(self):
+        self.cache.store(2, False, 1)
+        self.assertFalse(self.cache.lookup(2))
+        self.assertIsNone(self.cache.lookup(-2))
+        self.assertFalse(self.cache.is_decided(2))
+
+        # Deleting clauses keeps a non entailment, adding one to the component may create the entailment.
+        self.components.unlink_clause((1, 2), 2)
+        self.assertFalse(self.cache.lookup(2))
+        self.components.link_clause((2,), 3)
+        self.assertIsNone(self.cache.lookup(2))
+
+    def test_other_component(self):
+        self.cache.store(1, True, 1)
+        self.cache.store(2, False, 1)
+        self.components.link_clause((5, 6), 2)
+        self.components.unlink_clause((5, 6), 3)
+        self.assertTrue(self.cache.lookup(1))
+        self.assertFalse(self.cache.lookup(2))
+        self.assertEqual(self.cache.get_stamps(7), (0, 0))
+
+    def test_fact_replaces_not_entailed(self):
+        self.cache.store(-1, False, 1)
+        self.cache.store(1, True, 2)
+        self.assertNotIn(-1, self.cache.not_entailed_dict)
+        self.assertFalse(self.cache.lookup(-1))
+
+    def test_stats(self):
+        self.cache.store(1, True, 1)
+        self.cache.lookup(1)
+        self.cache.lookup(2)
+        self.cache.is_decided(1)
+        self.assertEqual(self.cache.get_stats(), {'cache_hits': 1, 'cache_misses': 1, 'facts': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
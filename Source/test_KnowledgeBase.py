@@ -0,0 +1,257 @@
+import random
+import unittest
+
+import KnowledgeBase
+import SolverBackends
+
+VAR_COUNT = 12
+
+
+def get_random_clause(rng, hidden_dict):
+    # At least one literal agrees with the hidden assignment, so the KB stays consistent as the cache requires.
+    var_list = rng.sample(range(1, VAR_COUNT + 1), rng.randint(1, 3))
+    clause = [var if rng.random() < 0.5 else -var for var in var_list]
+    clause[0] = hidden_dict[var_list[0]]
+    return clause
+
+
+def solver_entails(clause_list, literal):
+    solver = SolverBackends.get_backend(SolverBackends.DEFAULT_BACKEND)()
+    for clause in clause_list:
+        solver.add_clause(clause)
+    result = not solver.solve(assumptions=[-literal])
+    solver.delete()
+    return result
+
+
+class KnowledgeBaseTestCase(unittest.TestCase):
+    def make_kb(self, gc_threshold=KnowledgeBase.KnowledgeBase.GC_THRESHOLD):
+        # Selectors are numbered past the variables of the clauses, as AgentBrain does with its VariableTable.
+        kb = KnowledgeBase.KnowledgeBase(first_free_var=VAR_COUNT + 1, gc_threshold=gc_threshold)
+        self.addCleanup(kb.close)
+        return kb
+
+    def assert_matches_reference(self, kb, var_list=range(1, VAR_COUNT + 1)):
+        # infer_reference() solves the active clauses from scratch on a fresh solver.
+        for var in var_list:
+            for literal in [var, -var]:
+                self.assertEqual(kb.infer([[-literal]]), kb.infer_reference([[-literal]]), 'KB |= ' + str(literal))
+
+
+class TestGroups(KnowledgeBaseTestCase):
+    def test_retract_group(self):
+        kb = self.make_kb()
+        kb.add_clause([1], 'percept')
+        kb.add_clause([-1, 2])
+        kb.add_clause([-2, 3], 'percept')
+        self.assertTrue(kb.infer([[-3]]))
+        self.assert_matches_reference(kb, [1, 2, 3])
+
+        kb.retract_group('percept')
+        self.assertFalse(kb.infer([[-3]]))
+        self.assertFalse(kb.infer([[-2]]))
+        self.assertNotIn((1,), kb.KB)
+        self.assert_matches_reference(kb, [1, 2, 3])
+
+        # The permanent clause survives, a new fact reaches it through the solver session again.
+        kb.add_clause([1])
+        self.assertTrue(kb.infer([[-2]]))
+        self.assertFalse(kb.infer([[-3]]))
+        self.assert_matches_reference(kb, [1, 2, 3])
+
+    def test_retract_after_solver_query(self):
+        # The clauses reach the solver session first, so retracting has to go through the selector.
+        kb = self.make_kb()
+        kb.add_clause([1, 2])
+        kb.add_clause([-1, 3], 'percept')
+        kb.add_clause([-2, 3], 'percept')
+        # Several assumptions go straight to the session of the component.
+        self.assertTrue(kb.infer([[-3], [1]]))
+        self.assertTrue(kb.session_dict)
+        kb.retract_group('percept')
+        self.assertTrue(kb.session_dict)
+        self.assertFalse(kb.infer([[-3], [1]]))
+        self.assertFalse(kb.infer([[-3]]))
+        self.assertEqual(kb.retract_count, 1)
+        self.assert_matches_reference(kb, [1, 2, 3])
+
+    def test_retracted_group_is_closed(self):
+        kb = self.make_kb()
+        kb.add_clause([1, 2], 'old')
+        kb.retract_group('old')
+        with self.assertRaises(TypeError):
+            kb.add_clause([3], 'old')
+
+    def test_random_groups(self):
+        for seed in range(30):
+            rng = random.Random(seed)
+            hidden_dict = {var: var if rng.random() < 0.5 else -var for var in range(1, VAR_COUNT + 1)}
+            kb = self.make_kb()
+            group_list = []
+            for step in range(30):
+                if rng.random() < 0.2 and group_list:
+                    kb.retract_group(group_list.pop(rng.randrange(len(group_list))))
+                elif rng.random() < 0.5:
+                    if not group_list or rng.random() < 0.3:
+                        group_list.append(step)
+                    kb.add_clause(get_random_clause(rng, hidden_dict), rng.choice(group_list))
+                else:
+                    kb.add_clause(get_random_clause(rng, hidden_dict))
+                if step % 5 == 4:
+                    self.assert_matches_reference(kb, rng.sample(range(1, VAR_COUNT + 1), 4))
+            self.assert_matches_reference(kb)
+
+
+class TestBackbone(KnowledgeBaseTestCase):
+    def test_backbone(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            hidden_dict = {var: var if rng.random() < 0.5 else -var for var in range(1, VAR_COUNT + 1)}
+            kb = self.make_kb()
+            for _ in range(rng.randint(5, 25)):
+                kb.add_clause(get_random_clause(rng, hidden_dict))
+            var_list = rng.sample(range(1, VAR_COUNT + 1), 8)
+            backbone_dict = kb.compute_backbone(var_list)
+            for var in var_list:
+                if kb.infer_reference([[-var]]):
+                    expected = var
+                elif kb.infer_reference([[var]]):
+                    expected = -var
+                else:
+                    expected = None
+                self.assertEqual(backbone_dict[var], expected, 'seed ' + str(seed) + ' var ' + str(var))
+            # The answers went to the entailment cache, infer() must agree with them.
+            self.assert_matches_reference(kb, var_list)
+
+    def test_free_var(self):
+        kb = self.make_kb()
+        kb.add_clause([1, 2])
+        self.assertEqual(kb.compute_backbone([1, 5]), {1: None, 5: None})
+        self.assertFalse(kb.infer([[-5]]))
+
+
+class TestComponents(KnowledgeBaseTestCase):
+    def test_merge_stamps(self):
+        kb = self.make_kb()
+        kb.add_clause([1, 2])
+        kb.add_clause([3, 4])
+        self.assertNotEqual(kb.components.find(1), kb.components.find(3))
+        self.assertFalse(kb.infer([[-4]]))      # Cached as not entailed.
+
+        kb.add_clause([-1])
+        add_stamp, _ = kb.cache.get_stamps(4)
+        self.assertLess(add_stamp, kb.version)  # Another component changed, the answer about 4 still holds.
+
+        # The merged component carries the stamp of the clause that joined it, the cached answer is stale.
+        kb.add_clause([-2, -3])
+        root = kb.components.find(1)
+        self.assertEqual(kb.components.find(4), root)
+        self.assertEqual(kb.components.add_stamp_dict[root], kb.version)
+        self.assertTrue(kb.infer([[-4]]))
+        self.assert_matches_reference(kb, [1, 2, 3, 4])
+
+    def test_delete_stamps(self):
+        kb = self.make_kb()
+        kb.add_clause([1, 2])
+        kb.add_clause([3, 4])
+        kb.add_clause([-1])
+        kb.add_clause([-2, -3])
+        self.assertTrue(kb.infer([[-4]]))       # Cached as a fact.
+
+        # Deleting never splits a component, the partition only gets coarser. The delete stamp still tells the
+        # cache that the fact about 4 may be gone.
+        kb.del_clause([-2, -3])
+        root = kb.components.find(1)
+        self.assertEqual(kb.components.find(4), root)
+        self.assertEqual(kb.components.del_stamp_dict[root], kb.version)
+        self.assertFalse(kb.infer([[-4]]))
+        self.assert_matches_reference(kb, [1, 2, 3, 4])
+
+    def test_merge_sessions(self):
+        # Each component has its own session until a clause joins them, then the larger one takes the other's
+        # clauses and the smaller one is deleted.
+        kb = self.make_kb()
+        kb.add_clause([1, 2])
+        kb.add_clause([1, -2])
+        kb.add_clause([3, 4])
+        kb.add_clause([5, 6])
+        self.assertTrue(kb.infer([[-1], [3]]))
+        self.assertFalse(kb.infer([[-3], [5]]))
+        self.assertEqual(len(kb.session_dict), 3)
+        kb.add_clause([-1, -3])
+        self.assertEqual(len(kb.session_dict), 2)
+        self.assertIn(kb.components.find(3), kb.session_dict)
+        self.assertTrue(kb.infer([[-4], [5]]))
+        self.assert_matches_reference(kb, range(1, 7))
+
+
+class TestSimplify(KnowledgeBaseTestCase):
+    def test_delete_rewritten_clause(self):
+        # [1, 2] is stored as [2] once -1 is substituted, deleting the clause as given can not take [2] back.
+        kb = self.make_kb(gc_threshold=1)
+        kb.add_clause([-1])
+        kb.add_clause([1, 2])
+        kb.add_clause([3, 4])
+        self.assertGreater(kb.simplify_count, 0)
+        with self.assertRaises(TypeError):
+            kb.del_clause([1, 2])
+        with self.assertRaises(TypeError):
+            kb.del_clause([-1])
+        self.assertTrue(kb.infer([[-2]]))
+        kb.del_clause([3, 4])
+        self.assertFalse(kb.infer([[-3], [-4]]))
+
+    def test_delete_subsuming_clause(self):
+        # Deleting [1, 2] would lose [1, 2, 3], which simplify() dropped as subsumed by it.
+        kb = self.make_kb()
+        kb.add_clause([1, 2, 3])
+        kb.add_clause([1, 2])
+        kb.simplify()
+        self.assertNotIn((1, 2, 3), kb.KB)
+        with self.assertRaises(TypeError):
+            kb.del_clause([1, 2])
+
+    def test_random_workload(self):
+        # Interleaved additions, groups, retractions and deletions, with simplify() running every few clauses.
+        # The answers are checked on the clauses as given, so a rewrite that loses or keeps too much shows.
+        for seed in range(30):
+            rng = random.Random(seed)
+            hidden_dict = {var: var if rng.random() < 0.5 else -var for var in range(1, VAR_COUNT + 1)}
+            kb = self.make_kb(gc_threshold=6)
+            clause_dict = {}    # clause as given -> group
+            group_list = []
+            for step in range(40):
+                choice = rng.random()
+                if choice < 0.5:
+                    clause = get_random_clause(rng, hidden_dict)
+                    kb.add_clause(clause)
+                    clause_dict.setdefault(kb.standardize_clause(clause), None)
+                elif choice < 0.75:
+                    if not group_list or rng.random() < 0.3:
+                        group_list.append(step)
+                    group = rng.choice(group_list)
+                    clause = get_random_clause(rng, hidden_dict)
+                    kb.add_clause(clause, group)
+                    clause_dict.setdefault(kb.standardize_clause(clause), group)
+                elif choice < 0.85 and group_list:
+                    group = group_list.pop(rng.randrange(len(group_list)))
+                    kb.retract_group(group)
+                    clause_dict = {clause: other for clause, other in clause_dict.items() if other != group}
+                elif clause_dict:
+                    clause = rng.choice(list(clause_dict))
+                    try:
+                        kb.del_clause(clause)
+                        del clause_dict[clause]
+                    except TypeError:
+                        pass
+                if step % 4 == 3:
+                    for var in rng.sample(range(1, VAR_COUNT + 1), 4):
+                        for literal in [var, -var]:
+                            self.assertEqual(kb.infer([[-literal]]), solver_entails(list(clause_dict), literal),
+                                             'seed ' + str(seed) + ' step ' + str(step) + ' literal ' + str(literal))
+            self.assert_matches_reference(kb)
+            self.assertGreater(kb.simplify_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+
+import SolverBackends
+from Propagator import UnitPropagator
+
+VAR_COUNT = 10
+
+
+def solver_entails(clause_list, literal):
+    solver = SolverBackends.get_backend(SolverBackends.DEFAULT_BACKEND)()
+    for clause in clause_list:
+        solver.add_clause(clause)
+    result = not solver.solve(assumptions=[-literal])
+    solver.delete()
+    return result
+
+
+class TestUnitPropagator(unittest.TestCase):
+    def test_chain(self):
+        propagator = UnitPropagator()
+        for clause in [[-1, -2, 3], [-3, 4], [1]]:
+            propagator.add_clause(clause)
+        self.assertIsNone(propagator.entails(4))
+        # The unit 2 makes [-1, -2, 3] unit once its watch moves past the false literals.
+        propagator.add_clause([2])
+        self.assertEqual(propagator.trail, [1, 2, 3, 4])
+        self.assertTrue(propagator.entails(4))
+        self.assertFalse(propagator.entails(-4))
+
+    def test_probe_undoes_its_assignments(self):
+        propagator = UnitPropagator()
+        for clause in [[-1, 2], [-2, 3], [-1, -3]]:
+            propagator.add_clause(clause)
+        # 1 implies 2, 3 and a conflict, so -1 is entailed without being on the trail.
+        self.assertTrue(propagator.entails(-1))
+        self.assertEqual(propagator.trail, [])
+        self.assertIsNone(propagator.entails(2))
+
+    def test_inconsistent(self):
+        propagator = UnitPropagator()
+        for clause in [[1, 2], [-1], [-2]]:
+            propagator.add_clause(clause)
+        self.assertTrue(propagator.inconsistent)
+        self.assertTrue(propagator.entails(5))
+
+    def test_matches_solver(self):
+        # Propagation is incomplete: it may leave a query open, but every answer it gives is the solver's.
+        decided_count = 0
+        for seed in range(50):
+            rng = random.Random(seed)
+            hidden_list = [None] + [var if rng.random() < 0.5 else -var for var in range(1, VAR_COUNT + 1)]
+            clause_list = []
+            propagator = UnitPropagator()
+            for _ in range(rng.randint(3, 20)):
+                # One literal agrees with the hidden assignment, an inconsistent KB would entail anything.
+                var_list = rng.sample(range(1, VAR_COUNT + 1), rng.randint(1, 3))
+                clause = [hidden_list[var_list[0]]] + [var if rng.random() < 0.5 else -var for var in var_list[1:]]
+                clause_list.append(clause)
+                propagator.add_clause(clause)
+            for var in range(1, VAR_COUNT + 1):
+                for literal in [var, -var]:
+                    result = propagator.entails(literal)
+                    if result is not None:
+                        decided_count += 1
+                        self.assertEqual(result, solver_entails(clause_list, literal),
+                                         'seed ' + str(seed) + ' literal ' + str(literal))
+        self.assertGreater(decided_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
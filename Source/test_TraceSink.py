@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+import Algorithms
+import TraceSink
+import kb_reader
+import map_generator
+
+
+def get_trace_size_per_action(map_size, tmp_dir, checkpoint_ratio=TraceSink.CHECKPOINT_RATIO):
+    map_filename = os.path.join(tmp_dir, 'map_%d.txt' % map_size)
+    trace_filename = os.path.join(tmp_dir, 'trace_%d.txt' % map_size)
+    map_generator.generate_map_file(map_size, 11, map_filename)
+    trace = TraceSink.TraceSink(trace_filename, checkpoint_ratio=checkpoint_ratio)
+    action_list, _, _ = Algorithms.AgentBrain(map_filename, trace_filename, trace=trace).solve_wumpus_world()
+    return os.path.getsize(trace_filename) / len(action_list), trace_filename
+
+
+class TestCheckpoints(unittest.TestCase):
+    def test_size_is_linear(self):
+        # The KB grows with the map, full dumps at a fixed interval would make the bytes per action grow with it.
+        # On these maps the KB peaks about three times larger on the bigger one.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            small_size, _ = get_trace_size_per_action(20, tmp_dir)
+            large_size, trace_filename = get_trace_size_per_action(40, tmp_dir)
+            self.assertLess(large_size, 1.5 * small_size)
+
+            kind_list = [event.kind for event in kb_reader.read_kb_events(trace_filename)]
+            checkpoint_count = kind_list.count(TraceSink.KB_DUMP) + kind_list.count(TraceSink.KB_UPDATE)
+            self.assertGreater(checkpoint_count, 1)
+            self.assertGreater(kind_list.count(TraceSink.KB_DELTA), checkpoint_count)
+
+    def test_full_dumps(self):
+        # A ratio of 0 dumps the whole KB at every event, as the original result files do.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _, trace_filename = get_trace_size_per_action(10, tmp_dir, 0)
+            kind_list = [event.kind for event in kb_reader.read_kb_events(trace_filename)]
+            self.assertTrue(kind_list)
+            self.assertNotIn(TraceSink.KB_DELTA, kind_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import unittest
+
+import Algorithms
+import Planner
+import TraceSink
+import Zobrist
+
+MAP_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Assets', 'Input', 'map_1.txt')
+
+
+def run_agent(agent_class):
+    agent = agent_class(MAP_FILENAME, os.devnull, trace=TraceSink.TraceSink(os.devnull, level=TraceSink.OFF))
+    action_list = [event.action for event in agent.iter_actions()]
+    explored_list = [cell.map_pos for cell_row in agent.cell_matrix for cell in cell_row if cell.is_explored()]
+    return agent, action_list, explored_list
+
+
+class SelfLoopAgentBrain(Algorithms.AgentBrain):
+    # A cell without children lists itself as its child, so the search comes back to every leaf it visits.
+    def visit_cell(self):
+        result = yield from super().visit_cell()
+        if result and not self.agent_cell.child_list:
+            self.agent_cell.child_list.append(self.agent_cell)
+        return result
+
+
+class TestZobristState(unittest.TestCase):
+    def test_visit_key_ignores_heading(self):
+        state = Zobrist.ZobristState(16, Planner.HEADING_LIST)
+        state.set_position(3)
+        state.set_heading(Planner.UP)
+        key = state.get_visit_key(3, Planner.UP, 7)
+        state.turn(Planner.UP, Planner.LEFT)
+        self.assertEqual(state.get_visit_key(3, Planner.LEFT, 7), key)
+        state.move(3, 7)
+        self.assertEqual(state.get_visit_key(7, Planner.LEFT, 7), key)
+        state.toggle_explored(7)
+        self.assertNotEqual(state.get_visit_key(7, Planner.LEFT, 7), key)
+
+
+class TestVisitedStateTable(unittest.TestCase):
+    def test_repeated_step(self):
+        table = Zobrist.VisitedStateTable()
+        table.visit(11)
+        table.visit(22)
+        table.visit(11)
+        self.assertEqual(table.get_repeated_step(11), 1)
+        self.assertEqual(table.get_repeated_step(22), 2)
+        self.assertIsNone(table.get_repeated_step(33))
+        self.assertEqual(table.repeat_count, 2)
+        self.assertEqual(len(table), 2)
+
+    def test_repeated_visit_is_pruned(self):
+        agent, action_list, explored_list = run_agent(Algorithms.AgentBrain)
+        self.assertEqual(agent.visited_state_table.repeat_count, 0)
+
+        # Every leaf is expanded a second time with nothing changed since its visit, the table prunes it and the
+        # search carries on exactly as without the loops.
+        loop_agent, loop_action_list, loop_explored_list = run_agent(SelfLoopAgentBrain)
+        self.assertGreater(loop_agent.visited_state_table.repeat_count, 0)
+        self.assertEqual(loop_action_list, action_list)
+        self.assertEqual(loop_explored_list, explored_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
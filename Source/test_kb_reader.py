@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import Algorithms
+import ClauseStore
+import TraceSink
+import kb_reader
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Assets', 'Input')
+
+
+def get_kb_state_list(map_filename, trace_filename, checkpoint_ratio, encoder='text'):
+    # Small gc_threshold values make simplify() run often, it removes clauses and adds them back strengthened.
+    trace = TraceSink.TraceSink(trace_filename, encoder, checkpoint_ratio=checkpoint_ratio)
+    Algorithms.AgentBrain(map_filename, trace_filename, gc_threshold=8, trace=trace).solve_wumpus_world()
+    return [list(kb_dict) for _, _, kb_dict in
+            kb_reader.iter_kb_states(kb_reader.read_kb_events(trace_filename, encoder))]
+
+
+class TestJournal(unittest.TestCase):
+    def test_changes(self):
+        store = ClauseStore.ClauseStore()
+        for clause in [(1, 2), (3,), (4, -5)]:
+            store.add(clause)
+        store.journal = {}
+        store.discard((1, 2))
+        store.add((6,))
+        store.add((1, 2))
+        store.add((7,))
+        store.discard((7,))
+        store.discard((3,))
+        # (1, 2) came back after (6,) and the added (7,) cancelled out.
+        self.assertEqual(list(store.journal.items()), [((6,), 1), ((1, 2), 0), ((3,), -1)])
+        self.assertEqual(list(store.clause_dict), [(-5, 4), (6,), (1, 2)])
+
+
+class TestReplay(unittest.TestCase):
+    def test_replay_matches_full_dump(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for map_name in ['map_1.txt', 'map_5.txt', 'map_6.txt']:
+                map_filename = os.path.join(INPUT_DIR, map_name)
+                full_list = get_kb_state_list(map_filename, os.path.join(tmp_dir, 'full.txt'), 0)
+                self.assertTrue(full_list)
+                for encoder in ['text', 'binary']:
+                    delta_list = get_kb_state_list(map_filename, os.path.join(tmp_dir, 'delta'), 0.3, encoder)
+                    if encoder == 'binary':
+                        # Binary clauses hold literals, compare them in the names of the text dump.
+                        agent = Algorithms.AgentBrain(map_filename, os.path.join(tmp_dir, 'names.txt'))
+                        delta_list = [[tuple(agent.var_table.get_name(literal) for literal in clause)
+                                       for clause in kb_list] for kb_list in delta_list]
+                    # Same clauses in the same order at every step, not only the same sets.
+                    self.assertEqual(delta_list, full_list, map_name + ' ' + encoder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import argparse
+import glob
+import os
+import sys
+
+import MapValidator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report every inconsistency of Wumpus World map files.')
+    parser.add_argument('maps', nargs='+', help='map files or directories of *.txt maps')
+    parser.add_argument('--repair', action='store_true',
+                        help='rewrite the files with Breeze and Stench derived from the Pits and Wumpuses')
+    args = parser.parse_args()
+
+    map_list = []
+    for path in args.maps:
+        map_list.extend(sorted(glob.glob(os.path.join(path, '*.txt'))) if os.path.isdir(path) else [path])
+
+    blocking_count = 0
+    for map_filename in map_list:
+        try:
+            issue_list = MapValidator.validate_map_file(map_filename, args.repair)
+        except (TypeError, ValueError) as e:
+            print(map_filename + ': ' + str(e))
+            blocking_count += 1
+            continue
+        print(map_filename + ': ' + (str(len(issue_list)) + ' issues' if issue_list else 'ok') +
+              (', repaired' if args.repair and issue_list else ''))
+        for issue in issue_list:
+            where = '' if issue.matrix_pos is None else ' at row %d column %d' % issue.matrix_pos
+            print('    ' + issue.kind + where)
+        if not args.repair:
+            blocking_count += any(issue.kind in MapValidator.BLOCKING_KIND_LIST for issue in issue_list)
+    sys.exit(1 if blocking_count else 0)
+
+
+if __name__ == '__main__':
+    main()